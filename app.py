@@ -1,187 +1,157 @@
 import streamlit as st
-from modules.auth import login_page, logout
+from modules.auth import login_page, logout, clear_login_state
+from modules.sessions import validate_session
 from datetime import datetime, timedelta, timezone
-from contextlib import closing
 import json
-import os
-import psycopg2
-import threading
 
-# ==== 导入采集函数 ====
-from data_sources import get_fetch_function
+from utils.db_utils import pooled_connection
 
-# ==== 导入 Polymarket 渲染器 ====
-from renderers import polymarket_renderer
+# ==== 导入数据源注册表与刷新调度 ====
+from data_sources import get_source
+from data_sources.refresh import refresh_events, request_refresh
+from data_sources.ttl import needs_refresh
+
+# ==== 导入渲染器注册表 ====
+from renderers import get_renderer
 
 # ==== 导入评论模块 ====
 from modules.comments import display_comments_section
 
+# ==== 导入排行榜模块 ====
+from modules.leaderboard import display_leaderboard
+
 
 # =================== 辅助函数定义（必须放前面）===================
 
-def show_events_by_category(conn, category, user_role, user_id):
+def show_events_by_category(category, user_role, user_id):
     """显示某个主分类下的所有事件（无子分类）"""
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT slug, title, lists, apis 
-            FROM contents 
-            WHERE categories = %s AND sub_category IS NULL 
-            ORDER BY slug;
-        """, (category,))
-        events = cur.fetchall()
+    # 先取完数据并归还连接，渲染卡片期间不占用连接池
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT slug, title, lists, apis, updated_time 
+                FROM contents 
+                WHERE categories = %s AND sub_category IS NULL 
+                ORDER BY slug;
+            """, (category,))
+            events = cur.fetchall()
 
     if not events:
         st.info(f"分类 {category} 下暂无事件")
         return
 
-    for slug, title, lists_data, api_source in events:
-        render_event_card(slug, title, lists_data, api_source, user_role, user_id, conn)
+    for slug, title, lists_data, api_source, updated_time in events:
+        render_event_card(slug, title, lists_data, api_source, updated_time, user_role, user_id)
 
 
-def show_events_by_sub_category(conn, category, sub_category, user_role, user_id):
+def show_events_by_sub_category(category, sub_category, user_role, user_id):
     """显示某个子分类下的事件"""
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT slug, title, lists, apis 
-            FROM contents 
-            WHERE categories = %s AND sub_category = %s 
-            ORDER BY slug;
-        """, (category, sub_category))
-        events = cur.fetchall()
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT slug, title, lists, apis, updated_time 
+                FROM contents 
+                WHERE categories = %s AND sub_category = %s 
+                ORDER BY slug;
+            """, (category, sub_category))
+            events = cur.fetchall()
 
     if not events:
         st.info(f"子分类 {sub_category} 下暂无事件")
         return
 
-    for slug, title, lists_data, api_source in events:
-        render_event_card(slug, title, lists_data, api_source, user_role, user_id, conn)
+    for slug, title, lists_data, api_source, updated_time in events:
+        render_event_card(slug, title, lists_data, api_source, updated_time, user_role, user_id)
 
 
-def render_event_card(slug, title, lists_data, api_source, user_role, user_id, conn):
+def render_event_card(slug, title, lists_data, api_source, updated_time, user_role, user_id):
     """渲染单个事件卡片"""
     with st.expander(f"📎 {title or slug}"):
+        event_card(slug, title, lists_data, api_source, updated_time, user_role, user_id)
 
-        try:
-            if isinstance(lists_data, str):
-                event_data = json.loads(lists_data)
-            else:
-                event_data = lists_data
 
-            if not isinstance(event_data, dict):
-                st.error("❌ 数据格式错误")
-                return
-
-        except Exception as e:
-            st.error(f"❌ 解析数据失败：{e}")
-            return
-
-        # ==== 渲染器选择 ====
-        if api_source == "polymarket":
-            polymarket_renderer.display_event(event_data)
+@st.fragment
+def event_card(slug, title, lists_data, api_source, updated_time, user_role, user_id):
+    """
+    卡片内容（fragment）：卡片内的点赞、回复、刷新等交互只重跑这张卡片，
+    不会重新查询分类、重绘其他卡片。卡片不持有数据库连接，重跑时也不会借用已归还的连接。
+    """
+    try:
+        if isinstance(lists_data, str):
+            event_data = json.loads(lists_data)
         else:
-            st.info("⚠️ 当前数据源暂不支持展示")
+            event_data = lists_data
 
-        # ==== 评论区 ====
-        st.divider()
-        display_comments_section(event_title=title, user_id=user_id)
-
-        # ==== 刷新按钮逻辑（管理员专属）====
-        with conn.cursor() as cur:
-            cur.execute("SELECT updated_time FROM contents WHERE slug = %s", (slug,))
-            updated_time_row = cur.fetchone()
-
-        updated_time = updated_time_row[0] if updated_time_row else None
+        if not isinstance(event_data, dict):
+            st.error("❌ 数据格式错误")
+            return
 
-        now = datetime.now(timezone.utc)
+    except Exception as e:
+        st.error(f"❌ 解析数据失败：{e}")
+        return
 
-        if updated_time is not None:
-            if updated_time.tzinfo is None:
-                updated_time = updated_time.replace(tzinfo=timezone.utc)
+    if updated_time is not None:
+        if updated_time.tzinfo is None:
+            updated_time = updated_time.replace(tzinfo=timezone.utc)
+        else:
+            updated_time = updated_time.astimezone(timezone.utc)
+
+    # 管理员在本会话中刚刷新过的事件：数据库中的数据比它旧时使用刷新后的数据
+    if "refreshed_events" not in st.session_state:
+        st.session_state["refreshed_events"] = {}
+    refreshed = st.session_state["refreshed_events"].get(slug)
+    if refreshed and (updated_time is None or refreshed[1] > updated_time):
+        event_data, updated_time = refreshed
+
+    # ==== 渲染器选择（按数据源声明的渲染器查表）====
+    source = get_source(api_source) if api_source else None
+    renderer = get_renderer(source.renderer) if source else None
+    if renderer:
+        renderer(event_data)
+    else:
+        st.info("⚠️ 当前数据源暂不支持展示")
+
+    # ==== 评论区 ====
+    st.divider()
+    display_comments_section(event_title=title, user_id=user_id)
+
+    # ==== 刷新按钮逻辑（管理员专属）====
+    now = datetime.now(timezone.utc)
+
+    # 按事件活跃度决定刷新间隔：已关闭不刷新，高成交量/临近结束更频繁，无成交退避
+    interval = source.refresh_interval(event_data, now=now) if source else timedelta(hours=6)
+    is_recently_updated = not needs_refresh(updated_time, interval, now=now)
+
+    if not is_recently_updated:
+        button_label = "🔄 刷新事件"
+    elif updated_time is not None:
+        button_label = f"🕒 {updated_time.strftime('%Y-%m-%d %H:%M')}"
+    else:
+        button_label = "🔒 已关闭"
+    button_disabled = is_recently_updated
+    button_type = "secondary" if is_recently_updated else "primary"
+
+    if user_role == "admin" and source:
+        if st.button(
+            button_label,
+            key=f"refresh_{slug}",
+            disabled=button_disabled,
+            type=button_type,
+            use_container_width=True
+        ):
+            with st.spinner(f"🔄 正在从 {api_source} 获取最新数据..."):
+                fresh_event = refresh_events({api_source: [slug]}).get(api_source, {}).get(slug)
+
+            if fresh_event:
+                st.session_state["refreshed_events"][slug] = (fresh_event, datetime.now(timezone.utc))
+                st.toast("✅ 已更新事件数据")
+                st.rerun(scope="fragment")
             else:
-                updated_time = updated_time.astimezone(timezone.utc)
-
-        six_hours_ago = now - timedelta(hours=6)
-        is_recently_updated = updated_time is not None and updated_time > six_hours_ago
-
-        button_label = f"🕒 {updated_time.strftime('%Y-%m-%d %H:%M')}" if is_recently_updated else "🔄 刷新事件"
-        button_disabled = is_recently_updated
-        button_type = "secondary" if is_recently_updated else "primary"
-
-        if user_role == "admin" and api_source:
-            fetch_func = get_fetch_function(api_source)
-
-            if st.button(
-                button_label,
-                key=f"refresh_{slug}",
-                disabled=button_disabled,
-                type=button_type,
-                use_container_width=True
-            ):
-                with st.spinner(f"🔄 正在从 {api_source} 获取最新数据..."):
-                    fresh_event = fetch_func(slug)
-
-                    if fresh_event:
-                        with conn.cursor() as cur_update:
-                            cur_update.execute("""
-                                UPDATE contents 
-                                SET lists = %s, updated_time = %s
-                                WHERE slug = %s
-                            """, (
-                                json.dumps(fresh_event, ensure_ascii=False),
-                                datetime.now(timezone.utc),  # 使用带时区的时间
-                                slug
-                            ))
-                            conn.commit()
-
-                        st.success("✅ 已更新事件数据")
-                        event_data = fresh_event
-                    else:
-                        st.warning("⚠️ 无法获取最新数据")
-
-        # ===== 异步刷新逻辑开始 =====
-        def async_refresh_task():
-            try:
-                with closing(get_db_connection()) as refresh_conn:
-                    with refresh_conn.cursor() as cur:
-                        cur.execute("SELECT updated_time FROM contents WHERE slug = %s", (slug,))
-                        updated_time_row = cur.fetchone()
-
-                    now = datetime.now(timezone.utc)
-                    updated_time = updated_time_row[0] if updated_time_row else None
-
-                    if updated_time is not None and updated_time.tzinfo is None:
-                        updated_time = updated_time.replace(tzinfo=timezone.utc)
-
-                    six_hours_ago = now - timedelta(hours=6)
-                    needs_refresh = updated_time is None or updated_time < six_hours_ago
-
-                    if needs_refresh and api_source:
-                        fetch_func = get_fetch_function(api_source)
-                        fresh_event = fetch_func(slug)
-
-                        if fresh_event:
-                            with refresh_conn.cursor() as cur_update:
-                                cur_update.execute("""
-                                    UPDATE contents 
-                                    SET lists = %s, updated_time = %s
-                                    WHERE slug = %s
-                                """, (
-                                    json.dumps(fresh_event, ensure_ascii=False),
-                                    now,
-                                    slug
-                                ))
-                                refresh_conn.commit()
-                                print(f"[后台刷新成功] 事件 {slug} 已更新")
-                        else:
-                            print(f"[后台刷新失败] 无法从 {api_source} 获取数据：{slug}")
-
-            except Exception as e:
-                print(f"[后台刷新异常] {slug}: {str(e)}")
-
-        # 只有非管理员访问时才触发自动刷新（避免重复刷新）
-        if api_source and user_role != "admin":
-            thread = threading.Thread(target=async_refresh_task, daemon=True)
-            thread.start()
+                st.warning("⚠️ 无法获取最新数据")
+
+    # 只有非管理员访问时才登记后台刷新（避免重复刷新），由进程级调度器去重并按数据源并行执行
+    if source and user_role != "admin" and not is_recently_updated:
+        request_refresh(api_source, slug)
 
 
 # ===== 初始化会话状态 =====
@@ -193,32 +163,30 @@ if "role" not in st.session_state:
     st.session_state["role"] = None
 if "user_id" not in st.session_state:
     st.session_state["user_id"] = None
+if "session_token" not in st.session_state:
+    st.session_state["session_token"] = None
 
-# ===== 从 URL 参数恢复会话状态 =====
-query_params = st.query_params
-if 'logged_in' in query_params and 'username' in query_params:
-    logged_in = query_params['logged_in'] == 'True'
-    username = query_params['username']
-
-    # 可选：验证用户是否存在数据库中（提高安全性）
+# ===== 每次运行都校验会话令牌：刷新页面时恢复登录状态，会话被吊销 / 过期后立即登出 =====
+# 命中进程内缓存时只是一次内存查找
+session_token = st.session_state["session_token"] or st.query_params.get("sid")
+if session_token:
     try:
-        from utils.db_utils import get_db_connection
-        with closing(get_db_connection()) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT id, role FROM users WHERE username = %s", (username,))
-                result = cur.fetchone()
-                if result:
-                    user_id, role = result
-                    st.session_state["logged_in"] = logged_in
-                    st.session_state["username"] = username
-                    st.session_state["role"] = role
-                    st.session_state["user_id"] = user_id
-                else:
-                    st.session_state["logged_in"] = False
-                    st.query_params.clear()
+        session = validate_session(session_token)
     except Exception as e:
-        st.session_state["logged_in"] = False
-        st.query_params.clear()
+        # 数据库暂时不可用时保持当前状态，下次运行再校验
+        print(f"[会话校验异常] {e}")
+    else:
+        if session:
+            st.session_state["logged_in"] = True
+            st.session_state["username"] = session["username"]
+            st.session_state["role"] = session["role"]
+            st.session_state["user_id"] = session["user_id"]
+            st.session_state["session_token"] = session_token
+        else:
+            clear_login_state()
+elif st.session_state["logged_in"]:
+    # 没有会话令牌的登录状态不可信
+    clear_login_state()
 
 # ===== 页面配置 =====
 st.set_page_config(page_title="🔍 多源事件数据浏览器", layout="wide")
@@ -241,22 +209,13 @@ with col2:
         logout()
         st.rerun()
 
-# 更新 URL 参数以反映当前登录状态
-st.query_params.update({
-    "logged_in": str(st.session_state["logged_in"]),
-    "username": st.session_state["username"]
-})
-
 # ===== 页面标题 =====
 st.title("🔍 多源事件数据浏览器")
 
 # ===== 数据库连接与主逻辑 =====
 try:
-    from utils.db_utils import get_db_connection
-
-    with closing(get_db_connection()) as conn:
-
-        # 查询所有主分类及其子分类
+    # 查询所有主分类及其子分类（只在查询期间占用连接）
+    with pooled_connection() as conn:
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT DISTINCT categories, sub_category 
@@ -265,37 +224,40 @@ try:
             """)
             rows = cur.fetchall()
 
-        # 构建主分类 -> 子分类映射
-        category_sub_map = {}
-        for category, sub_category in rows:
-            if category not in category_sub_map:
-                category_sub_map[category] = set()
-            if sub_category is not None:
-                category_sub_map[category].add(sub_category)
-
-        # 获取所有主分类
-        categories = list(category_sub_map.keys())
-
-        if not categories:
-            st.warning("数据库中没有可用内容")
-            st.stop()
-
-        # 使用 tabs 显示不同分类
-        tabs = st.tabs(categories)
-
-        for tab, category in zip(tabs, categories):
-            with tab:
-                sub_categories = category_sub_map.get(category, set())
-
-                if not sub_categories or None in sub_categories:
-                    # 如果没有子分类或只有空子分类，则直接显示该 category 下的所有事件
-                    show_events_by_category(conn, category, user_role, user_id)
-                else:
-                    # 否则用子 tab 分类显示
-                    sub_tabs = st.tabs(sorted(sub_categories))
-                    for sub_tab, sub_category in zip(sub_tabs, sorted(sub_categories)):
-                        with sub_tab:
-                            show_events_by_sub_category(conn, category, sub_category, user_role, user_id)
+    # 构建主分类 -> 子分类映射
+    category_sub_map = {}
+    for category, sub_category in rows:
+        if category not in category_sub_map:
+            category_sub_map[category] = set()
+        if sub_category is not None:
+            category_sub_map[category].add(sub_category)
+
+    # 获取所有主分类
+    categories = list(category_sub_map.keys())
+
+    if not categories:
+        st.warning("数据库中没有可用内容")
+        st.stop()
+
+    # 使用 tabs 显示排行榜和不同分类
+    leaderboard_tab, *tabs = st.tabs(["🏆 排行榜"] + categories)
+
+    with leaderboard_tab:
+        display_leaderboard()
+
+    for tab, category in zip(tabs, categories):
+        with tab:
+            sub_categories = category_sub_map.get(category, set())
+
+            if not sub_categories or None in sub_categories:
+                # 如果没有子分类或只有空子分类，则直接显示该 category 下的所有事件
+                show_events_by_category(category, user_role, user_id)
+            else:
+                # 否则用子 tab 分类显示
+                sub_tabs = st.tabs(sorted(sub_categories))
+                for sub_tab, sub_category in zip(sub_tabs, sorted(sub_categories)):
+                    with sub_tab:
+                        show_events_by_sub_category(category, sub_category, user_role, user_id)
 
 except Exception as e:
-    st.error(f"应用运行错误：{str(e)}")
\ No newline at end of file
+    st.error(f"应用运行错误：{str(e)}")
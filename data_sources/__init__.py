@@ -1,12 +1,20 @@
 # data_sources/__init__.py
 
-from .polymarket import fetch_polymarket_event
+from datetime import timedelta
 
-# 支持的数据源名称 → 对应采集函数
-SOURCE_FUNCTIONS = {
-    "polymarket": fetch_polymarket_event,
-    # "example_api": fetch_example_api_event,
-}
+from .registry import DataSource, register_source, get_source, list_sources
+from .polymarket import fetch_polymarket_event, list_polymarket_events
+
+# 支持的数据源：新增数据源只需在此注册（并在 renderers 中注册同名渲染器）
+register_source(DataSource(
+    name="polymarket",
+    fetch=fetch_polymarket_event,
+    list_events=list_polymarket_events,
+    renderer="polymarket",
+    batch_size=20,
+    rate_limit=5.0,
+    max_concurrency=4,
+    ttl=timedelta(hours=6),
+))
+# register_source(DataSource(name="example_api", fetch=fetch_example_api_event, ...))
 
-def get_fetch_function(source_name):
-    return SOURCE_FUNCTIONS.get(source_name)
\ No newline at end of file
@@ -0,0 +1,282 @@
+# data_sources/aggregates.py
+"""
+事件级 / 分类级预聚合：
+刷新与导入路径写入 contents 后调用 update_aggregates，
+排行榜页面只需对 event_aggregates / category_aggregates 做一次带索引的查询。
+不经过写路径的变更（直接删除 / 移动 contents 中的事件）由 sync_aggregates 清理，
+tools/rebuild_aggregates 会调用它。
+概率变动只统计未关闭的市场（已结算市场的价格会跳到 0 / 1）；本次没有任何市场变动时保留上次记录的
+最大变动，因此用未变的 contents 重建不会清空涨跌榜。
+"""
+import json
+import threading
+from datetime import datetime, timezone
+
+_tables_ready = False
+_tables_lock = threading.Lock()
+
+
+def ensure_aggregate_tables(conn):
+    """首次使用时建表（每个进程只执行一次）"""
+    global _tables_ready
+    if _tables_ready:
+        return
+    with _tables_lock:
+        if _tables_ready:
+            return
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS event_aggregates (
+                    slug TEXT PRIMARY KEY,
+                    title TEXT,
+                    source TEXT,
+                    categories TEXT,
+                    sub_category TEXT,
+                    closed BOOLEAN NOT NULL DEFAULT FALSE,
+                    total_volume DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    volume24hr DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    liquidity DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    active_markets INTEGER NOT NULL DEFAULT 0,
+                    market_prices JSONB NOT NULL DEFAULT '{}'::jsonb,
+                    max_prob_change DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    top_mover_market TEXT,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+                CREATE INDEX IF NOT EXISTS event_aggregates_volume24hr_idx
+                    ON event_aggregates (volume24hr DESC);
+                CREATE INDEX IF NOT EXISTS event_aggregates_prob_change_idx
+                    ON event_aggregates ((ABS(max_prob_change)) DESC);
+
+                CREATE TABLE IF NOT EXISTS category_aggregates (
+                    categories TEXT PRIMARY KEY,
+                    event_count INTEGER NOT NULL DEFAULT 0,
+                    total_volume DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    volume24hr DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    liquidity DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    active_markets INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+            """)
+            conn.commit()
+        _tables_ready = True
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _yes_price(market):
+    prices = market.get("outcomePrices")
+    try:
+        prices = json.loads(prices) if isinstance(prices, str) else prices
+        return float(prices[0]) if prices else None
+    except (ValueError, TypeError, IndexError):
+        return None
+
+
+def compute_event_aggregate(event, previous_prices=None):
+    """
+    由规范化后的事件数据计算聚合值；previous_prices 为上次记录的 {市场: Yes 概率}
+    market_prices 只记录未关闭的市场，已关闭的市场不参与概率变动
+    """
+    previous_prices = previous_prices or {}
+    markets = event.get("markets", []) or []
+
+    prices = {}
+    for i, market in enumerate(markets):
+        if market.get("closed", False):
+            continue
+        price = _yes_price(market)
+        if price is not None:
+            prices[market.get("groupItemTitle") or str(i)] = price
+
+    max_change, top_mover = 0.0, None
+    for name, price in prices.items():
+        if name in previous_prices:
+            change = price - _to_float(previous_prices[name])
+            if abs(change) > abs(max_change):
+                max_change, top_mover = change, name
+
+    return {
+        "slug": event.get("slug"),
+        "title": event.get("title"),
+        "closed": bool(event.get("closed")),
+        "total_volume": _to_float(event.get("volume")),
+        "volume24hr": _to_float(event.get("volume24hr")),
+        "liquidity": _to_float(event.get("liquidity")),
+        "active_markets": sum(1 for m in markets if not m.get("closed", False)),
+        "market_prices": prices,
+        "max_prob_change": max_change,
+        "top_mover_market": top_mover,
+    }
+
+
+def update_aggregates(conn, events):
+    """写入（或更新）一批事件的聚合值，并重算受影响分类的汇总"""
+    from psycopg2.extras import execute_values
+
+    events = [event for event in events if event and event.get("slug")]
+    if not events:
+        return 0
+    ensure_aggregate_tables(conn)
+
+    slugs = [event["slug"] for event in events]
+    with conn.cursor() as cur:
+        # 同时取出旧分类：事件移到其他分类后，旧分类的汇总也要重算
+        cur.execute("SELECT slug, market_prices, categories FROM event_aggregates WHERE slug = ANY(%s)", (slugs,))
+        previous, affected = {}, set()
+        for slug, market_prices, categories in cur.fetchall():
+            previous[slug] = market_prices
+            affected.add(categories)
+
+        now = datetime.now(timezone.utc)
+        latest = {}
+        for event in events:
+            latest[event["slug"]] = compute_event_aggregate(event, previous.get(event["slug"]))
+        rows = [
+            (
+                agg["slug"], agg["title"], agg["closed"], agg["total_volume"], agg["volume24hr"],
+                agg["liquidity"], agg["active_markets"], json.dumps(agg["market_prices"], ensure_ascii=False),
+                agg["max_prob_change"], agg["top_mover_market"], now,
+            )
+            for agg in latest.values()
+        ]
+
+        # 分类信息取自 contents，保证与页面展示一致
+        new_categories = execute_values(cur, """
+            INSERT INTO event_aggregates (
+                slug, title, closed, total_volume, volume24hr, liquidity, active_markets,
+                market_prices, max_prob_change, top_mover_market, updated_at,
+                source, categories, sub_category
+            )
+            SELECT v.*, c.apis, c.categories, c.sub_category
+            FROM (VALUES %s) AS v (
+                slug, title, closed, total_volume, volume24hr, liquidity, active_markets,
+                market_prices, max_prob_change, top_mover_market, updated_at
+            )
+            JOIN contents c ON c.slug = v.slug
+            ON CONFLICT (slug) DO UPDATE SET
+                title = EXCLUDED.title,
+                closed = EXCLUDED.closed,
+                total_volume = EXCLUDED.total_volume,
+                volume24hr = EXCLUDED.volume24hr,
+                liquidity = EXCLUDED.liquidity,
+                active_markets = EXCLUDED.active_markets,
+                market_prices = EXCLUDED.market_prices,
+                -- 本次没有市场变动（如用未变的 contents 重建）时，保留仍未关闭的上次最大变动市场
+                max_prob_change = CASE
+                    WHEN EXCLUDED.top_mover_market IS NULL
+                         AND EXCLUDED.market_prices ? event_aggregates.top_mover_market
+                    THEN event_aggregates.max_prob_change ELSE EXCLUDED.max_prob_change END,
+                top_mover_market = CASE
+                    WHEN EXCLUDED.top_mover_market IS NULL
+                         AND EXCLUDED.market_prices ? event_aggregates.top_mover_market
+                    THEN event_aggregates.top_mover_market ELSE EXCLUDED.top_mover_market END,
+                updated_at = EXCLUDED.updated_at,
+                source = EXCLUDED.source,
+                categories = EXCLUDED.categories,
+                sub_category = EXCLUDED.sub_category
+            RETURNING categories
+        """, rows, template="(%s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s, %s, %s::timestamptz)", fetch=True)
+        affected.update(categories for (categories,) in new_categories)
+
+        # contents 中已删除的事件不会被上面的 JOIN 写入，这里删掉其残留的聚合行
+        cur.execute("""
+            DELETE FROM event_aggregates a
+            WHERE a.slug = ANY(%s) AND NOT EXISTS (SELECT 1 FROM contents c WHERE c.slug = a.slug)
+        """, (slugs,))
+
+        _recompute_categories(cur, affected)
+        conn.commit()
+    return len(rows)
+
+
+def _recompute_categories(cur, categories):
+    """按 event_aggregates 重算指定分类的汇总；已没有事件的分类删除其汇总行"""
+    categories = [category for category in categories if category is not None]
+    if not categories:
+        return
+    cur.execute("""
+        DELETE FROM category_aggregates c
+        WHERE c.categories = ANY(%s)
+          AND NOT EXISTS (SELECT 1 FROM event_aggregates a WHERE a.categories = c.categories)
+    """, (categories,))
+    cur.execute("""
+        INSERT INTO category_aggregates (
+            categories, event_count, total_volume, volume24hr, liquidity, active_markets, updated_at
+        )
+        SELECT categories, COUNT(*), SUM(total_volume), SUM(volume24hr), SUM(liquidity), SUM(active_markets), NOW()
+        FROM event_aggregates
+        WHERE categories = ANY(%s)
+        GROUP BY categories
+        ON CONFLICT (categories) DO UPDATE SET
+            event_count = EXCLUDED.event_count,
+            total_volume = EXCLUDED.total_volume,
+            volume24hr = EXCLUDED.volume24hr,
+            liquidity = EXCLUDED.liquidity,
+            active_markets = EXCLUDED.active_markets,
+            updated_at = EXCLUDED.updated_at
+    """, (categories,))
+
+
+def sync_aggregates(conn):
+    """
+    与 contents 对齐：删除已不存在事件的聚合行，同步被移动事件的分类 / 数据源，
+    并重算所有分类汇总（包括已清空的分类），返回 (删除数, 同步数)
+    """
+    ensure_aggregate_tables(conn)
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM event_aggregates a WHERE NOT EXISTS (SELECT 1 FROM contents c WHERE c.slug = a.slug)")
+        removed = cur.rowcount
+        cur.execute("""
+            UPDATE event_aggregates a
+            SET source = c.apis, categories = c.categories, sub_category = c.sub_category
+            FROM contents c
+            WHERE c.slug = a.slug
+              AND (a.source, a.categories, a.sub_category) IS DISTINCT FROM (c.apis, c.categories, c.sub_category)
+        """)
+        moved = cur.rowcount
+        cur.execute("SELECT categories FROM category_aggregates UNION SELECT categories FROM event_aggregates")
+        _recompute_categories(cur, [categories for (categories,) in cur.fetchall()])
+        conn.commit()
+    return removed, moved
+
+
+def safe_update_aggregates(conn, events):
+    """写路径调用：聚合失败只记录日志，不影响 contents 的写入"""
+    try:
+        return update_aggregates(conn, events)
+    except Exception as e:
+        conn.rollback()
+        print(f"[聚合更新异常] {e}")
+        return 0
+
+
+def rebuild_aggregates(conn, batch_size=1000):
+    """
+    全量重建（如首次上线时回填），使用命名游标分批读取 contents
+    contents 未变时价格与上次相同，已记录的最大变动会被保留
+    """
+    from utils.db_utils import get_db_connection
+    from contextlib import closing
+
+    ensure_aggregate_tables(conn)
+    total = 0
+    with closing(get_db_connection()) as read_conn:
+        with read_conn.cursor(name="aggregate_rebuild") as cur:
+            cur.itersize = batch_size
+            cur.execute("SELECT lists FROM contents")
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                events = [json.loads(lists) if isinstance(lists, str) else lists for (lists,) in rows]
+                total += update_aggregates(conn, [event for event in events if isinstance(event, dict)])
+
+    removed, moved = sync_aggregates(conn)
+    if removed or moved:
+        print(f"[聚合清理] 删除 {removed} 个已不存在的事件，同步 {moved} 个事件的分类")
+    return total
@@ -0,0 +1,146 @@
+# data_sources/ingest.py
+"""
+批量导入事件到 contents：
+- 按 slug 列表：通过数据源的 fetch 能力并发拉取（受数据源限速 / 并发上限约束）
+- 按查询条件：通过数据源的 list_events 分页列出
+规范化后的事件按批 INSERT ... ON CONFLICT (slug) DO UPDATE 写入，
+检查点文件记录已完成的 slug 和分页位置，中断后可从断点继续。
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+from .aggregates import safe_update_aggregates
+from .refresh import fetch_events
+
+# 检查点文件中记录分页位置的行前缀
+_OFFSET_PREFIX = "#offset="
+
+
+class Checkpoint:
+    """追加写的检查点文件：每行一个已完成的 slug，或一行 "#offset=N" 记录分页进度"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.done = set()
+        self.offset = 0
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith(_OFFSET_PREFIX):
+                        self.offset = int(line[len(_OFFSET_PREFIX):])
+                    elif line:
+                        self.done.add(line)
+
+    def _append(self, lines):
+        if not self.path:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(f"{line}\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def mark_done(self, slugs):
+        slugs = [slug for slug in slugs if slug not in self.done]
+        self.done.update(slugs)
+        self._append(slugs)
+
+    def set_offset(self, offset):
+        self.offset = offset
+        self._append([f"{_OFFSET_PREFIX}{offset}"])
+
+
+def upsert_events(conn, source_name, events, category, sub_category=None, updated_time=None):
+    """批量写入（已存在的 slug 更新数据，分类为空时保留原分类），返回写入行数"""
+    from psycopg2.extras import execute_values
+
+    updated_time = updated_time or datetime.now(timezone.utc)
+    # 同一批内 slug 去重，否则 ON CONFLICT 会因同一行被更新两次而报错
+    latest = {event["slug"]: event for event in events if event and event.get("slug")}
+    rows = [
+        (
+            slug,
+            event.get("title") or slug,
+            json.dumps(event, ensure_ascii=False),
+            source_name,
+            category,
+            sub_category,
+            updated_time,
+        )
+        for slug, event in latest.items()
+    ]
+    if not rows:
+        return 0
+
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            INSERT INTO contents (slug, title, lists, apis, categories, sub_category, updated_time)
+            VALUES %s
+            ON CONFLICT (slug) DO UPDATE SET
+                title = EXCLUDED.title,
+                lists = EXCLUDED.lists,
+                apis = EXCLUDED.apis,
+                categories = COALESCE(EXCLUDED.categories, contents.categories),
+                sub_category = COALESCE(EXCLUDED.sub_category, contents.sub_category),
+                updated_time = EXCLUDED.updated_time
+        """, rows, template="(%s, %s, %s::jsonb, %s, %s, %s, %s::timestamptz)", page_size=500)
+        conn.commit()
+
+    safe_update_aggregates(conn, list(latest.values()))
+    return len(rows)
+
+
+def import_slugs(conn, source, slugs, category, sub_category=None, batch_size=500, checkpoint=None, progress=None):
+    """
+    按 slug 列表导入，返回 (成功数, 失败的 slug 列表)
+    progress 为可选回调 progress(n)，每完成 n 个 slug 调用一次
+    """
+    checkpoint = checkpoint or Checkpoint()
+    pending = [slug for slug in dict.fromkeys(slugs) if slug not in checkpoint.done]
+    imported, failed = 0, []
+
+    for i in range(0, len(pending), batch_size):
+        batch = pending[i:i + batch_size]
+        fetched = fetch_events(source, batch)
+        events = [event for event in fetched.values() if event]
+        imported += upsert_events(conn, source.name, events, category, sub_category)
+
+        failed.extend(slug for slug in batch if not fetched.get(slug))
+        checkpoint.mark_done(slug for slug in batch if fetched.get(slug))
+        if progress:
+            progress(len(batch))
+
+    return imported, failed
+
+
+def import_query(conn, source, query, category, sub_category=None, page_size=100,
+                 max_events=None, checkpoint=None, progress=None):
+    """按数据源的查询条件分页导入，返回成功数"""
+    if not source.supports_listing:
+        raise ValueError(f"数据源 {source.name} 不支持按条件列出事件")
+
+    checkpoint = checkpoint or Checkpoint()
+    offset, imported = checkpoint.offset, 0
+
+    while max_events is None or offset < max_events:
+        source.limiter.acquire()
+        page = source.list_events(query, limit=page_size, offset=offset)
+        if page is None:
+            raise RuntimeError(f"分页请求失败（offset={offset}），可使用同一检查点文件重试")
+        if not page:
+            break
+
+        events = [event for event in page if event.get("slug") not in checkpoint.done]
+        imported += upsert_events(conn, source.name, events, category, sub_category)
+
+        checkpoint.mark_done(event["slug"] for event in events if event.get("slug"))
+        offset += len(page)
+        checkpoint.set_offset(offset)
+        if progress:
+            progress(len(page))
+
+        if len(page) < page_size:
+            break
+
+    return imported
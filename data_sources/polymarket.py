@@ -1,21 +1,24 @@
 # data_sources/polymarket.py
 
-import requests
 from urllib.parse import quote
 import json
 
+from utils.http_utils import get_http_session
+from utils.settings import get_settings
+
+
 def fetch_polymarket_event(slug):
     """
     从 Polymarket 获取事件数据（通过 slug）
     """
-    base_url = "https://gamma-api.polymarket.com/events"
-    headers = {"User-Agent": "MultiSourceEventBrowser/1.0"}
+    import requests
+    settings = get_settings()
+    base_url = f"{settings.polymarket_api_url}/events"
 
     try:
-        response = requests.get(
+        response = get_http_session().get(
             f"{base_url}?slug={quote(slug)}",
-            headers=headers,
-            timeout=10  # 加上超时
+            timeout=settings.http_timeout  # 加上超时
         )
         if response.status_code == 200:
             data = response.json()
@@ -34,6 +37,37 @@ def fetch_polymarket_event(slug):
 
     return None
 
+
+def list_polymarket_events(query, limit=100, offset=0):
+    """
+    按 Gamma API 查询条件分页列出事件（如 {"tag_slug": "politics", "closed": "false"}）
+    返回规范化后的事件列表；请求失败返回 None，已到末页返回空列表
+    """
+    import requests
+    settings = get_settings()
+    params = dict(query or {})
+    params.update({"limit": limit, "offset": offset})
+
+    try:
+        response = get_http_session().get(
+            f"{settings.polymarket_api_url}/events",
+            params=params,
+            timeout=settings.http_timeout
+        )
+        if response.status_code == 200:
+            data = response.json()
+            if isinstance(data, list):
+                return [extract_relevant_fields(event) for event in data]
+            print(f"[Polymarket] 列表响应格式异常: {type(data).__name__}")
+        else:
+            print(f"[Polymarket] 列表请求失败，状态码: {response.status_code}")
+    except requests.exceptions.RequestException as e:
+        print(f"[Polymarket] 网络请求失败: {e}")
+    except json.JSONDecodeError:
+        print("[Polymarket] 响应内容不是有效的 JSON")
+
+    return None
+
 def extract_relevant_fields(event):
     """提取最小字段集合"""
     markets = []
@@ -0,0 +1,198 @@
+# data_sources/refresh.py
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from .aggregates import safe_update_aggregates
+from .registry import get_source
+
+
+def _chunks(items, size):
+    size = max(1, size)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _fetch_one(source, slug):
+    source.limiter.acquire()
+    try:
+        return source.fetch(slug)
+    except Exception as e:
+        print(f"[刷新异常] {source.name}/{slug}: {e}")
+        return None
+
+
+async def _fetch_batch_async(source, slugs):
+    semaphore = asyncio.Semaphore(source.max_concurrency)
+
+    async def run(slug):
+        async with semaphore:
+            delay = source.limiter.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return slug, await source.fetch_async(slug)
+            except Exception as e:
+                print(f"[刷新异常] {source.name}/{slug}: {e}")
+                return slug, None
+
+    return dict(await asyncio.gather(*(run(slug) for slug in slugs)))
+
+
+def fetch_events(source, slugs):
+    """
+    按数据源声明的能力（批量 / 异步 / 并发数 / 限速）拉取一组事件
+    返回 {slug: event}，失败的 slug 对应 None
+    """
+    results = {}
+    slugs = list(dict.fromkeys(slugs))
+
+    for batch in _chunks(slugs, source.batch_size):
+        if source.supports_batch:
+            source.limiter.acquire()
+            try:
+                fetched = source.fetch_many(batch) or {}
+            except Exception as e:
+                print(f"[刷新异常] {source.name} 批量请求失败: {e}")
+                fetched = {}
+            results.update({slug: fetched.get(slug) for slug in batch})
+        elif source.supports_async:
+            results.update(asyncio.run(_fetch_batch_async(source, batch)))
+        else:
+            with ThreadPoolExecutor(max_workers=source.max_concurrency) as pool:
+                results.update(zip(batch, pool.map(lambda s: _fetch_one(source, s), batch)))
+
+    return results
+
+
+def fetch_all(slugs_by_source):
+    """各数据源并行拉取（每个数据源在自己的限制内调度），返回 {source_name: {slug: event}}"""
+    jobs = {}
+    for name, slugs in slugs_by_source.items():
+        source = get_source(name)
+        if source is None:
+            print(f"[刷新跳过] 未注册的数据源: {name}")
+            continue
+        if slugs:
+            jobs[name] = (source, list(slugs))
+
+    if not jobs:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = {name: pool.submit(fetch_events, source, slugs) for name, (source, slugs) in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def save_events(conn, events, updated_time=None):
+    """批量写回 contents.lists / updated_time，返回更新行数"""
+    from psycopg2.extras import execute_values
+
+    updated_time = updated_time or datetime.now(timezone.utc)
+    rows = [
+        (slug, json.dumps(event, ensure_ascii=False), updated_time)
+        for slug, event in events.items()
+        if event
+    ]
+    if not rows:
+        return 0
+
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            UPDATE contents AS c
+            SET lists = v.lists, updated_time = v.updated_time
+            FROM (VALUES %s) AS v (slug, lists, updated_time)
+            WHERE c.slug = v.slug
+        """, rows, template="(%s, %s::jsonb, %s::timestamptz)")
+        conn.commit()
+
+    safe_update_aggregates(conn, [event for event in events.values() if event])
+    return len(rows)
+
+
+def refresh_events(slugs_by_source):
+    """拉取并写回，返回 {source_name: {slug: event}}"""
+    from utils.db_utils import pooled_connection
+    from utils.icon_cache import schedule_prefetch
+
+    results = fetch_all(slugs_by_source)
+    fresh = {slug: event for events in results.values() for slug, event in events.items() if event}
+    if fresh:
+        with pooled_connection() as conn:
+            save_events(conn, fresh)
+        # 图标下载交给后台线程，不占用调用方（管理员点击刷新时即当前页面）
+        schedule_prefetch(fresh.values())
+    return results
+
+
+class RefreshScheduler:
+    """
+    进程级后台刷新调度器：
+    页面只负责登记过期事件，同一事件在排队/刷新中不会重复登记，
+    单个后台线程按数据源分组后并行刷新（各自受限速与并发上限约束）。
+    """
+
+    def __init__(self, retry_after=300):
+        self.retry_after = retry_after
+        self._pending = {}
+        self._in_flight = set()
+        self._attempted = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def request(self, source_name, slug):
+        key = (source_name, slug)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._in_flight or slug in self._pending.get(source_name, ()):
+                return False
+            if now - self._attempted.get(key, float("-inf")) < self.retry_after:
+                return False
+            self._pending.setdefault(source_name, set()).add(slug)
+            self._ensure_worker()
+        self._wakeup.set()
+        return True
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                self._wakeup.clear()
+                batch, self._pending = self._pending, {}
+                now = time.monotonic()
+                self._attempted = {k: t for k, t in self._attempted.items() if now - t < self.retry_after}
+                for name, slugs in batch.items():
+                    for slug in slugs:
+                        self._in_flight.add((name, slug))
+                        self._attempted[(name, slug)] = now
+
+            try:
+                results = refresh_events(batch)
+                for name, events in results.items():
+                    ok = sum(1 for event in events.values() if event)
+                    print(f"[后台刷新] {name}: 成功 {ok}/{len(events)}")
+            except Exception as e:
+                print(f"[后台刷新异常] {e}")
+            finally:
+                with self._lock:
+                    for name, slugs in batch.items():
+                        for slug in slugs:
+                            self._in_flight.discard((name, slug))
+
+
+_scheduler = RefreshScheduler()
+
+
+def request_refresh(source_name, slug):
+    """登记一个需要后台刷新的事件（非阻塞）"""
+    return _scheduler.request(source_name, slug)
@@ -0,0 +1,102 @@
+# data_sources/registry.py
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from .ttl import adaptive_interval
+
+
+class RateLimiter:
+    """令牌桶限速器（线程安全），rate 为每秒请求数，None 表示不限速"""
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """预占一个令牌，返回调用方需要等待的秒数"""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+@dataclass
+class DataSource:
+    """
+    数据源插件描述：
+    - fetch:           fetch(slug) -> dict | None，必填
+    - fetch_many:      fetch_many(slugs) -> {slug: dict}，可选，支持批量接口时提供
+    - fetch_async:     async fetch_async(slug) -> dict | None，可选
+    - list_events:     list_events(query, limit, offset) -> [dict] | None，可选，批量导入时按条件分页列出事件
+    - renderer:        对应 renderers 中注册的渲染器名称
+    - batch_size:      每批处理的 slug 数
+    - rate_limit:      每秒最多请求数（None 为不限速）
+    - max_concurrency: 同时进行的请求数上限
+    - ttl:             基准刷新间隔（实际间隔按事件活跃度调整，见 ttl.adaptive_interval）
+    """
+    name: str
+    fetch: Callable
+    renderer: Optional[str] = None
+    fetch_many: Optional[Callable] = None
+    fetch_async: Optional[Callable] = None
+    list_events: Optional[Callable] = None
+    batch_size: int = 20
+    rate_limit: Optional[float] = None
+    max_concurrency: int = 4
+    ttl: timedelta = timedelta(hours=6)
+
+    def __post_init__(self):
+        if self.renderer is None:
+            self.renderer = self.name
+        self.limiter = RateLimiter(self.rate_limit, burst=self.max_concurrency)
+
+    @property
+    def supports_async(self):
+        return self.fetch_async is not None
+
+    @property
+    def supports_batch(self):
+        return self.fetch_many is not None
+
+    @property
+    def supports_listing(self):
+        return self.list_events is not None
+
+    def refresh_interval(self, event_data, now=None):
+        """该事件的刷新间隔，None 表示不再刷新"""
+        return adaptive_interval(event_data, self.ttl, now=now)
+
+
+_SOURCES = {}
+
+
+def register_source(source):
+    """注册（或覆盖）一个数据源"""
+    _SOURCES[source.name] = source
+    return source
+
+
+def get_source(name):
+    return _SOURCES.get(name)
+
+
+def list_sources():
+    return list(_SOURCES.values())
@@ -0,0 +1,84 @@
+# data_sources/ttl.py
+
+from datetime import datetime, timedelta, timezone
+
+# 24 小时成交量阈值（USD）→ 刷新间隔，从高到低匹配
+VOLUME_TIERS = [
+    (1_000_000, timedelta(minutes=5)),
+    (100_000, timedelta(minutes=15)),
+    (10_000, timedelta(hours=1)),
+]
+
+# 距离结束时间 → 刷新间隔上限
+END_DATE_TIERS = [
+    (timedelta(hours=24), timedelta(minutes=15)),
+    (timedelta(days=7), timedelta(hours=1)),
+]
+
+# 已过结束时间但尚未标记关闭：定期检查以便尽快拿到关闭状态
+PAST_END_INTERVAL = timedelta(hours=1)
+
+# 24 小时无成交的事件退避到的间隔
+IDLE_INTERVAL = timedelta(hours=24)
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def adaptive_interval(event_data, base_ttl, now=None):
+    """
+    根据事件活跃度计算刷新间隔：
+    - closed 的事件返回 None（不再刷新）
+    - volume24hr 越高间隔越短，临近 endDate 时进一步缩短
+    - 24 小时无成交的事件退避到 IDLE_INTERVAL
+    """
+    if not isinstance(event_data, dict):
+        return base_ttl
+    if event_data.get("closed"):
+        return None
+
+    now = now or datetime.now(timezone.utc)
+    volume_24hr = _to_float(event_data.get("volume24hr"))
+
+    interval = base_ttl if volume_24hr > 0 else max(base_ttl, IDLE_INTERVAL)
+    for threshold, tier_interval in VOLUME_TIERS:
+        if volume_24hr >= threshold:
+            interval = min(interval, tier_interval)
+            break
+
+    end_date = _parse_date(event_data.get("endDate"))
+    if end_date is not None:
+        remaining = end_date - now
+        if remaining <= timedelta(0):
+            interval = min(interval, PAST_END_INTERVAL)
+        else:
+            for window, cap in END_DATE_TIERS:
+                if remaining <= window:
+                    interval = min(interval, cap)
+                    break
+
+    return interval
+
+
+def needs_refresh(updated_time, interval, now=None):
+    """interval 为 None 表示永不刷新；updated_time 为空表示从未刷新过"""
+    if interval is None:
+        return False
+    if updated_time is None:
+        return True
+    now = now or datetime.now(timezone.utc)
+    return updated_time <= now - interval
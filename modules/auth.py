@@ -1,15 +1,16 @@
 # modules/auth.py
 import streamlit as st
-from utils.db_utils import get_db_connection
-from contextlib import closing
-import bcrypt
+from utils.db_utils import pooled_connection
+from modules.sessions import create_session, revoke_session
 
 
 def hash_password(password):
+    import bcrypt
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 
 def check_password(password, hashed):
+    import bcrypt
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
 def login_form():
@@ -21,31 +22,32 @@ def login_form():
 
         if submit:
             try:
-                with closing(get_db_connection()) as conn:
+                with pooled_connection() as conn:
                     with conn.cursor() as cur:
                         cur.execute("SELECT id, password_hash, role FROM users WHERE username = %s", (username,))
                         result = cur.fetchone()
-                        if result:
-                            user_id, hashed, role = result
-                            if check_password(password, hashed):
-                                # ✅ 更新 session_state 中的登录状态
-                                st.session_state['logged_in'] = True
-                                st.session_state['username'] = username
-                                st.session_state['role'] = role
-                                st.session_state['user_id'] = user_id
-
-                                # ✅ 设置 URL 参数，用于刷新页面时恢复登录状态
-                                st.query_params.update({
-                                    "logged_in": "True",
-                                    "username": username
-                                })
-
-                                st.success(f"欢迎回来，{username}！")
-                                st.rerun()
-                            else:
-                                st.error("密码错误")
-                        else:
-                            st.error("用户名不存在")
+
+                # 先归还连接再签发会话，避免在持有连接时再次借用
+                if result:
+                    user_id, hashed, role = result
+                    if check_password(password, hashed):
+                        # ✅ 更新 session_state 中的登录状态
+                        st.session_state['logged_in'] = True
+                        st.session_state['username'] = username
+                        st.session_state['role'] = role
+                        st.session_state['user_id'] = user_id
+
+                        # ✅ 签发服务端会话令牌，URL 中只保存不透明令牌，用于刷新页面时恢复登录状态
+                        token = create_session(user_id, username, role)
+                        st.session_state['session_token'] = token
+                        st.query_params["sid"] = token
+
+                        st.success(f"欢迎回来，{username}！")
+                        st.rerun()
+                    else:
+                        st.error("密码错误")
+                else:
+                    st.error("用户名不存在")
             except Exception as e:
                 st.error(f"登录失败：{str(e)}")
 
@@ -65,7 +67,7 @@ def register_form():
                 st.warning("两次输入的密码不一致")
             else:
                 try:
-                    with closing(get_db_connection()) as conn:
+                    with pooled_connection() as conn:
                         with conn.cursor() as cur:
                             cur.execute("SELECT * FROM users WHERE username = %s", (username,))
                             if cur.fetchone():
@@ -79,23 +81,24 @@ def register_form():
                                 conn.commit()
                                 st.success("✅ 注册成功，请登录")
                 except Exception as e:
-                    conn.rollback()
                     st.error(f"注册失败：{str(e)}")
 
 
-def logout():
-    # 清除 session_state 中的所有登录相关字段
+def clear_login_state():
+    """清除 session_state 中的登录状态和 URL 中的会话令牌（不吊销服务端会话）"""
     st.session_state['logged_in'] = False
-    if 'username' in st.session_state:
-        del st.session_state['username']
-    if 'role' in st.session_state:
-        del st.session_state['role']
-    if 'user_id' in st.session_state:
-        del st.session_state['user_id']
-
-    # 清除 URL 参数（关键）
+    for key in ('username', 'role', 'user_id', 'session_token'):
+        st.session_state[key] = None
     st.query_params.clear()
 
+
+def logout():
+    # 吊销服务端会话（同步写库，其他进程最迟在缓存过期后失效）
+    revoke_session(st.session_state.get('session_token'))
+
+    # 清除登录相关字段和 URL 参数（关键）
+    clear_login_state()
+
     st.info("您已成功登出")
     st.rerun()  # 强制刷新页面以反映最新状态
 
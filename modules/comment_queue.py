@@ -0,0 +1,197 @@
+# modules/comment_queue.py
+"""
+评论写入队列（write-behind）：
+页面提交评论只做入队并立即返回，后台线程按批 INSERT；
+每条评论带幂等键（由用户和表单渲染时生成的提交编号决定），
+同一次提交的重复请求（双击、重复表单提交）在入队和入库两层都会被去重，
+而内容相同的新一次提交会照常写入。
+- 重试 MAX_RETRIES 次仍失败的评论记入 _abandoned_keys，页面据此撤下乐观展示并提示用户
+- 进程正常退出时在 EXIT_FLUSH_TIMEOUT_SECONDS 内补写队列中剩余的评论
+- 幂等键列与唯一索引由 python -m tools.migrate_comments 创建；读路径不做 DDL，
+  写入线程只在索引缺失时补建一次
+"""
+import atexit
+import hashlib
+import queue
+import secrets
+import threading
+import time
+
+from cachetools import TTLCache
+
+from utils.db_utils import pooled_connection
+
+MAX_QUEUE_SIZE = 1000
+BATCH_SIZE = 100
+FLUSH_INTERVAL_SECONDS = 0.5
+MAX_RETRIES = 3
+EXIT_FLUSH_TIMEOUT_SECONDS = 10
+
+_queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
+
+# 近期已入队的幂等键，拦截短时间内的重复提交
+_recent_keys = TTLCache(maxsize=10_000, ttl=600)
+# 放弃写入的幂等键，供页面撤下“发送中”的评论并提示失败
+_abandoned_keys = TTLCache(maxsize=10_000, ttl=3600)
+_recent_lock = threading.Lock()
+
+_worker = None
+_worker_lock = threading.Lock()
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def new_submission_id():
+    """评论表单渲染时生成的提交编号，提交成功后由页面更换"""
+    return secrets.token_urlsafe(16)
+
+
+def make_idempotency_key(user_id, submission_id):
+    """同一用户的同一个提交编号视为同一条评论（与内容无关）"""
+    raw = f"{user_id}\x1f{submission_id}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def migrate_comment_schema(conn):
+    """为 comments 增加幂等键列与唯一索引（tools.migrate_comments 调用，需要表的 DDL 权限）"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            ALTER TABLE comments ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+            CREATE UNIQUE INDEX IF NOT EXISTS comments_idempotency_key_idx ON comments (idempotency_key);
+        """)
+        conn.commit()
+
+
+def _ensure_comment_schema(conn):
+    """写入线程使用：唯一索引已存在时只查一次目录，不加锁也不需要 DDL 权限（每个进程只检查一次）"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('comments_idempotency_key_idx')")
+            exists = cur.fetchone()[0] is not None
+        if not exists:
+            print("[评论] 缺少幂等键索引，尝试补建（建议先运行 python -m tools.migrate_comments）")
+            migrate_comment_schema(conn)
+        _schema_ready = True
+
+
+def abandoned_keys(keys):
+    """返回 keys 中已放弃写入的幂等键"""
+    with _recent_lock:
+        return {key for key in keys if key in _abandoned_keys}
+
+
+def _abandon(item, reason):
+    print(f"[评论写入放弃] {reason}: {item['idempotency_key']}")
+    with _recent_lock:
+        _recent_keys.pop(item["idempotency_key"], None)
+        _abandoned_keys[item["idempotency_key"]] = True
+
+
+def enqueue_comment(user_id, content, parent_id=None, event_title=None, submission_id=None):
+    """
+    入队一条评论，返回 (幂等键, 是否为新提交)
+    未提供 submission_id 时每次调用都视为新提交；队列已满时抛出 queue.Full
+    """
+    key = make_idempotency_key(user_id, submission_id or new_submission_id())
+    with _recent_lock:
+        if key in _recent_keys:
+            return key, False
+        _queue.put_nowait({
+            "user_id": user_id,
+            "content": content,
+            "parent_id": parent_id,
+            "title": event_title,
+            "idempotency_key": key,
+            "retries": 0,
+        })
+        _recent_keys[key] = True
+
+    _ensure_worker()
+    return key, True
+
+
+def _drain_batch():
+    """阻塞等待第一条，然后在 FLUSH_INTERVAL 内尽量凑满一批"""
+    batch = [_queue.get()]
+    deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+    while len(batch) < BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def write_batch(batch):
+    """批量写入，已存在的幂等键直接忽略"""
+    from psycopg2.extras import execute_values
+
+    with pooled_connection() as conn:
+        _ensure_comment_schema(conn)
+        with conn.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO comments (user_id, content, parent_id, title, idempotency_key, created_at)
+                VALUES %s
+                ON CONFLICT (idempotency_key) DO NOTHING
+            """, [
+                (item["user_id"], item["content"], item["parent_id"], item["title"], item["idempotency_key"])
+                for item in batch
+            ], template="(%s, %s, %s, %s, %s, NOW())")
+            conn.commit()
+
+
+def _run():
+    while True:
+        batch = _drain_batch()
+        try:
+            write_batch(batch)
+        except Exception as e:
+            print(f"[评论写入异常] {len(batch)} 条: {e}")
+            for item in batch:
+                item["retries"] += 1
+                if item["retries"] > MAX_RETRIES:
+                    _abandon(item, f"重试 {MAX_RETRIES} 次仍失败")
+                    continue
+                try:
+                    _queue.put_nowait(item)
+                except queue.Full:
+                    _abandon(item, "队列已满")
+            time.sleep(1)
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="comment-writer", daemon=True)
+            _worker.start()
+
+
+def flush(timeout=None):
+    """等待队列中的评论全部写入（测试 / 退出前使用）"""
+    if timeout is None:
+        _queue.join()
+        return True
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return not _queue.unfinished_tasks
+
+
+@atexit.register
+def _flush_on_exit():
+    """进程退出前补写队列中剩余的评论（写入线程是守护线程，退出时会被直接终止）"""
+    if _queue.unfinished_tasks and not flush(timeout=EXIT_FLUSH_TIMEOUT_SECONDS):
+        print(f"[评论] 退出前未能写入 {_queue.unfinished_tasks} 条评论")
@@ -1,29 +1,29 @@
+import queue
+import time
+from datetime import datetime
+
 import streamlit as st
-from utils.db_utils import get_db_connection
+from utils.db_utils import pooled_connection
+from modules.comment_queue import abandoned_keys, enqueue_comment, new_submission_id
+
+# 本会话内评论列表的缓存时间（秒）
+COMMENT_CACHE_TTL_SECONDS = 15
 
 
-def create_comment(user_id, content, parent_id=None, event_title=None):
-    """创建评论并关联到特定内容"""
+def create_comment(user_id, content, parent_id=None, event_title=None, submission_id=None):
+    """提交评论到写入队列（异步批量入库），返回幂等键；队列已满返回 None"""
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO comments (user_id, content, parent_id, title, created_at)
-                    VALUES (%s, %s, %s, %s, NOW())
-                    RETURNING id
-                """, (user_id, content, parent_id, event_title))
-                comment_id = cur.fetchone()[0]
-                conn.commit()
-                return comment_id
-    except Exception as e:
-        st.error(f"提交评论失败: {str(e)}")
+        key, _ = enqueue_comment(user_id, content, parent_id=parent_id, event_title=event_title,
+                                 submission_id=submission_id)
+        return key
+    except queue.Full:
         return None
 
 
 def like_comment(comment_id):
     """为指定评论点赞"""
     try:
-        with get_db_connection() as conn:
+        with pooled_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     UPDATE comments 
@@ -42,12 +42,12 @@ def like_comment(comment_id):
 def get_comments(event_title):
     """获取特定内容的所有评论（包括回复）"""
     try:
-        with get_db_connection() as conn:
+        with pooled_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     WITH RECURSIVE comment_tree AS (
                         SELECT 
-                            c.id, c.user_id, u.username, c.content, c.parent_id, c.title, c.likes, c.created_at, 0 AS depth
+                            c.id, c.user_id, u.username, c.content, c.parent_id, c.title, c.likes, c.created_at, 0 AS depth, c.idempotency_key
                         FROM comments c
                         JOIN users u ON c.user_id = u.id
                         WHERE c.title = %s AND c.parent_id IS NULL
@@ -55,12 +55,12 @@ def get_comments(event_title):
                         UNION ALL
                         
                         SELECT 
-                            c.id, c.user_id, u.username, c.content, c.parent_id, c.title, c.likes, c.created_at, ct.depth + 1
+                            c.id, c.user_id, u.username, c.content, c.parent_id, c.title, c.likes, c.created_at, ct.depth + 1, c.idempotency_key
                         FROM comments c
                         JOIN users u ON c.user_id = u.id
                         JOIN comment_tree ct ON c.parent_id = ct.id
                     )
-                    SELECT id, user_id, username, content, parent_id, title, likes, created_at, depth
+                    SELECT id, user_id, username, content, parent_id, title, likes, created_at, depth, idempotency_key
                     FROM comment_tree
                     ORDER BY created_at ASC;
                 """, (event_title,))
@@ -70,61 +70,157 @@ def get_comments(event_title):
         return []
 
 
+def _comment_state():
+    """本会话的评论缓存、待入库评论和提示信息"""
+    if 'comment_cache' not in st.session_state:
+        st.session_state.comment_cache = {}
+    if 'pending_comments' not in st.session_state:
+        st.session_state.pending_comments = {}
+    if 'comment_flash' not in st.session_state:
+        st.session_state.comment_flash = {}
+    return st.session_state.comment_cache, st.session_state.pending_comments, st.session_state.comment_flash
+
+
+def _form_submission_id(form_key):
+    """表单渲染时取得本次提交编号（没有则生成），同一编号的重复提交只会写入一次"""
+    if 'comment_submission_ids' not in st.session_state:
+        st.session_state.comment_submission_ids = {}
+    ids = st.session_state.comment_submission_ids
+    if form_key not in ids:
+        ids[form_key] = new_submission_id()
+    return ids[form_key]
+
+
+def load_comments(event_title):
+    """读取评论（短时缓存），并合并尚未入库的本地评论"""
+    cache, pending, _ = _comment_state()
+    entry = cache.get(event_title)
+    if entry is None or time.monotonic() - entry["loaded_at"] > COMMENT_CACHE_TTL_SECONDS:
+        entry = {"rows": get_comments(event_title), "loaded_at": time.monotonic()}
+        cache[event_title] = entry
+
+    # 已入库的评论不再作为本地待提交评论展示
+    stored_keys = {row[9] for row in entry["rows"] if row[9]}
+    rows = [row for row in pending.get(event_title, []) if row[9] not in stored_keys]
+
+    # 后台放弃写入的评论：撤下“发送中”的展示并提示用户重新提交
+    failed = abandoned_keys(row[9] for row in rows)
+    for row in rows:
+        if row[9] in failed:
+            preview = row[3] if len(row[3]) <= 30 else row[3][:30] + "…"
+            st.error(f"评论发送失败，请重新提交：{preview}")
+    pending[event_title] = [row for row in rows if row[9] not in failed]
+    return entry["rows"] + pending[event_title]
+
+
+def _submit_comment(event_title, user_id, input_key, flash_key, parent_id=None, submission_id=None):
+    """
+    表单提交回调：入队并乐观地追加到本地评论树（在页面重跑前执行，无需 st.rerun）
+    submission_id 是渲染表单时绑定的提交编号，提交成功后才更换，因此重复提交同一表单只写入一次
+    """
+    _, pending, flash = _comment_state()
+    content = st.session_state.get(input_key, "")
+
+    if not content.strip():
+        flash[flash_key] = ("warning", "评论内容不能为空")
+        return
+    if not user_id:
+        flash[flash_key] = ("error", "❌ 用户未登录，无法发表评论")
+        return
+
+    key = create_comment(user_id, content, parent_id=parent_id, event_title=event_title,
+                         submission_id=submission_id)
+    if key is None:
+        flash[flash_key] = ("error", "提交评论失败，请稍后重试")
+        return
+    # 提交成功：下次渲染的表单使用新编号
+    st.session_state.comment_submission_ids[flash_key] = new_submission_id()
+
+    rows = pending.setdefault(event_title, [])
+    if all(row[9] != key for row in rows):
+        rows.append((
+            key, user_id, st.session_state.get("username"), content, parent_id,
+            event_title, 0, datetime.now(), 0, key
+        ))
+    st.session_state[input_key] = ""
+    if parent_id is not None:
+        st.session_state.reply_forms[parent_id] = False
+    flash[flash_key] = ("success", "✅ 回复成功！" if parent_id is not None else "✅ 评论已提交！")
+
+
+def _like_comment(event_title, comment_id):
+    """点赞回调：写库后直接更新本地缓存中的点赞数，无需整页重跑"""
+    cache, _, _ = _comment_state()
+    new_likes = like_comment(comment_id)
+    if new_likes is None:
+        return
+    entry = cache.get(event_title)
+    if entry:
+        entry["rows"] = [
+            row[:6] + (new_likes,) + row[7:] if row[0] == comment_id else row
+            for row in entry["rows"]
+        ]
+    st.toast("已点赞！💖")
+
+
+def _show_flash(flash_key):
+    _, _, flash = _comment_state()
+    if flash_key in flash:
+        level, message = flash.pop(flash_key)
+        getattr(st, level)(message)
+
+
 def display_comments_section(event_title, user_id):
     """显示评论区组件"""
     st.subheader("💬 讨论区")
 
+    # 初始化 session_state 控制展开状态
+    if 'reply_forms' not in st.session_state:
+        st.session_state.reply_forms = {}
+
     # 评论输入表单
-    with st.form(key=f"comment_form_{event_title}"):
-        comment_text = st.text_area("写下你的评论...", height=100)
-        submitted = st.form_submit_button("发布评论")
-
-        if submitted:
-            if not comment_text.strip():
-                st.warning("评论内容不能为空")
-            elif not user_id:
-                st.error("❌ 用户未登录，无法发表评论")
-            else:
-                comment_id = create_comment(user_id, comment_text, event_title=event_title)
-                if comment_id:
-                    st.success("✅ 评论已提交！")
-                    st.rerun()
-                else:
-                    st.error("提交评论失败，请重试")
+    form_key = f"comment_form_{event_title}"
+    with st.form(key=form_key):
+        st.text_area("写下你的评论...", height=100, key=f"comment_input_{event_title}")
+        st.form_submit_button(
+            "发布评论",
+            on_click=_submit_comment,
+            args=(event_title, user_id, f"comment_input_{event_title}", form_key, None,
+                  _form_submission_id(form_key))
+        )
+    _show_flash(form_key)
 
     # 加载并显示评论
-    comments = get_comments(event_title)
+    comments = load_comments(event_title)
 
     if not comments:
         st.info("还没有评论，快来发起讨论吧！")
     else:
-        # 构建评论树结构
+        # 构建评论树结构（未入库的评论以幂等键作为 id）
         comment_dict = {}
         for row in comments:
-            comment_id, _, username, content, parent_id, _, likes, created_at, depth = row
+            comment_id, _, username, content, parent_id, _, likes, created_at, depth, key = row
             comment_dict[comment_id] = {
                 "username": username,
                 "content": content,
                 "likes": likes,
                 "created_at": created_at,
                 "depth": depth,
+                "parent_id": parent_id,
+                "pending": comment_id == key,
                 "replies": []
             }
 
         # 建立父子关系
         root_comments = []
         for comment_id, data in comment_dict.items():
-            parent_id = comments[[c[0] for c in comments].index(comment_id)][4]
+            parent_id = data["parent_id"]
             if parent_id is None:
                 root_comments.append(comment_id)
             else:
                 if parent_id in comment_dict:
                     comment_dict[parent_id]["replies"].append(comment_id)
 
-        # 初始化 session_state 控制展开状态
-        if 'reply_forms' not in st.session_state:
-            st.session_state.reply_forms = {}
-
         def toggle_reply_form(cid):
             st.session_state.reply_forms[cid] = not st.session_state.reply_forms.get(cid, False)
 
@@ -132,54 +228,47 @@ def display_comments_section(event_title, user_id):
         def render_comment_tree(comment_ids, depth=0):
             for comment_id in comment_ids:
                 comment = comment_dict[comment_id]
+                pending_note = ' <small style="color: #94a3b8;">（发送中）</small>' if comment["pending"] else ""
 
                 # 显示评论卡片
                 st.markdown(f"""
                     <div style="border-left: 3px solid #e2e8f0; padding-left: 1rem; margin-bottom: 1rem; margin-left: {depth * 1}rem;">
                         <strong>{comment['username']}</strong> 
-                        <small style="color: #64748b;">{comment['created_at'].strftime('%Y-%m-%d %H:%M')}</small>
+                        <small style="color: #64748b;">{comment['created_at'].strftime('%Y-%m-%d %H:%M')}</small>{pending_note}
                         <p>{comment['content']}</p>
                     </div>
                 """, unsafe_allow_html=True)
 
+                # 未入库的评论暂不支持点赞 / 回复
+                if comment["pending"]:
+                    continue
+
                 # 点赞按钮和回复按钮布局
                 col1, col2 = st.columns([1, 5])
                 with col1:
-                    if st.button(f"❤️ {comment['likes']}", key=f"like_{comment_id}"):
-                        new_likes = like_comment(comment_id)
-                        if new_likes is not None:
-                            st.success("已点赞！💖")
-                            st.rerun()
+                    st.button(f"❤️ {comment['likes']}", key=f"like_{comment_id}",
+                              on_click=_like_comment, args=(event_title, comment_id))
 
                 with col2:
-                    if st.button("🗨️ 回复", key=f"btn_toggle_reply_{comment_id}"):
-                        toggle_reply_form(comment_id)
+                    st.button("🗨️ 回复", key=f"btn_toggle_reply_{comment_id}",
+                              on_click=toggle_reply_form, args=(comment_id,))
 
                 # 展开回复表单
+                reply_form_key = f"reply_form_{comment_id}"
                 if st.session_state.reply_forms.get(comment_id, False):
                     with st.container():
-                        with st.form(key=f"reply_form_{comment_id}"):
-                            reply_content = st.text_area("写下你的回复...", key=f"reply_input_{comment_id}")
-                            submit_reply = st.form_submit_button("发送回复")
-
-                            if submit_reply and reply_content.strip():
-                                if not user_id:
-                                    st.error("❌ 用户未登录，无法回复")
-                                else:
-                                    result = create_comment(
-                                        user_id=user_id,
-                                        content=reply_content,
-                                        parent_id=comment_id,
-                                        event_title=event_title
-                                    )
-                                    if result:
-                                        st.success("✅ 回复成功！")
-                                        st.rerun()
-                                    else:
-                                        st.error("❌ 提交回复失败，请重试")
+                        with st.form(key=reply_form_key):
+                            st.text_area("写下你的回复...", key=f"reply_input_{comment_id}")
+                            st.form_submit_button(
+                                "发送回复",
+                                on_click=_submit_comment,
+                                args=(event_title, user_id, f"reply_input_{comment_id}", reply_form_key,
+                                      comment_id, _form_submission_id(reply_form_key))
+                            )
+                _show_flash(reply_form_key)
 
                 # 递归渲染子评论
                 if comment["replies"]:
                     render_comment_tree(comment["replies"], depth + 1)
 
-        render_comment_tree(root_comments)
\ No newline at end of file
+        render_comment_tree(root_comments)
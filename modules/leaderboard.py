@@ -0,0 +1,100 @@
+import streamlit as st
+
+from data_sources.aggregates import ensure_aggregate_tables
+from renderers.polymarket_renderer import format_number
+from utils.db_utils import pooled_connection
+
+LEADERBOARD_LIMIT = 20
+
+
+def _query(conn, sql, params=()):
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def _load_leaderboard(conn):
+    ensure_aggregate_tables(conn)
+
+    top_volume = _query(conn, """
+        SELECT title, categories, volume24hr, total_volume, liquidity, active_markets
+        FROM event_aggregates
+        WHERE NOT closed
+        ORDER BY volume24hr DESC
+        LIMIT %s
+    """, (LEADERBOARD_LIMIT,))
+
+    top_movers = _query(conn, """
+        SELECT title, categories, top_mover_market, max_prob_change, volume24hr
+        FROM event_aggregates
+        WHERE NOT closed AND max_prob_change <> 0
+        ORDER BY ABS(max_prob_change) DESC
+        LIMIT %s
+    """, (LEADERBOARD_LIMIT,))
+
+    categories = _query(conn, """
+        SELECT categories, event_count, volume24hr, total_volume, liquidity, active_markets
+        FROM category_aggregates
+        ORDER BY volume24hr DESC
+    """)
+    return top_volume, top_movers, categories
+
+
+def display_leaderboard():
+    """排行榜：只读取预聚合表，每个榜单一次带索引的查询（取完数据即归还连接）"""
+    try:
+        with pooled_connection() as conn:
+            top_volume, top_movers, categories = _load_leaderboard(conn)
+    except Exception as e:
+        st.error(f"加载排行榜失败：{e}")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### 🔥 24小时成交量最高")
+        if not top_volume:
+            st.info("暂无数据")
+        else:
+            st.dataframe([
+                {
+                    "事件": title,
+                    "分类": category,
+                    "24h 成交量": format_number(vol_24hr),
+                    "总交易量": format_number(volume),
+                    "流动性": format_number(liquidity),
+                    "活跃市场": active,
+                }
+                for title, category, vol_24hr, volume, liquidity, active in top_volume
+            ], use_container_width=True, hide_index=True)
+
+    with col2:
+        st.markdown("### 📈 概率变化最大（自上次刷新）")
+        if not top_movers:
+            st.info("暂无数据")
+        else:
+            st.dataframe([
+                {
+                    "事件": title,
+                    "分类": category,
+                    "市场": market,
+                    "Yes 概率变化": f"{change * 100:+.1f}%",
+                    "24h 成交量": format_number(vol_24hr),
+                }
+                for title, category, market, change, vol_24hr in top_movers
+            ], use_container_width=True, hide_index=True)
+
+    st.markdown("### 🗂️ 分类汇总")
+    if not categories:
+        st.info("暂无数据")
+    else:
+        st.dataframe([
+            {
+                "分类": category,
+                "事件数": count,
+                "24h 成交量": format_number(vol_24hr),
+                "总交易量": format_number(volume),
+                "流动性": format_number(liquidity),
+                "活跃市场": active,
+            }
+            for category, count, vol_24hr, volume, liquidity, active in categories
+        ], use_container_width=True, hide_index=True)
@@ -0,0 +1,220 @@
+# modules/sessions.py
+"""
+服务端会话：
+- 登录后签发不透明令牌（随机串 + HMAC 签名），数据库只保存令牌的 SHA-256
+- 校验时先验签（伪造令牌不查库），再查进程内 TTL 缓存，未命中才查 sessions 表
+- 吊销立即从本进程缓存移除并同步写库；写库失败的吊销与过期清理由后台线程批量重试 / 完成，
+  进程正常退出时再补写一次
+"""
+import atexit
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from cachetools import TTLCache
+
+from utils.db_utils import pooled_connection
+from utils.settings import get_settings
+
+# 进程内缓存的有效期（秒）：其他进程吊销的会话最多在这段时间后失效
+CACHE_TTL_SECONDS = 300
+CACHE_MAX_SIZE = 10_000
+
+# 后台批量吊销 / 清理过期会话的周期（秒）
+MAINTENANCE_INTERVAL_SECONDS = 60
+
+_cache = TTLCache(maxsize=CACHE_MAX_SIZE, ttl=CACHE_TTL_SECONDS)
+_cache_lock = threading.Lock()
+
+_pending_revocations = set()
+_maintenance_lock = threading.Lock()
+_maintenance_thread = None
+
+_table_ready = False
+_table_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _secret():
+    secret = get_settings().session_secret
+    if not secret:
+        print("[会话] 未设置 SESSION_SECRET，使用进程内随机密钥（重启后已有会话失效）")
+        secret = secrets.token_hex(32)
+    return secret.encode("utf-8")
+
+
+def _sign(value):
+    digest = hmac.new(_secret(), value.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:18]).decode("ascii")
+
+
+def _token_hash(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def ensure_sessions_table():
+    """首次使用时建表（每个进程只执行一次）"""
+    global _table_ready
+    if _table_ready:
+        return
+    with _table_lock:
+        if _table_ready:
+            return
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS sessions (
+                        token_hash TEXT PRIMARY KEY,
+                        user_id INTEGER NOT NULL,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                        expires_at TIMESTAMPTZ NOT NULL,
+                        revoked_at TIMESTAMPTZ
+                    );
+                    CREATE INDEX IF NOT EXISTS sessions_expires_at_idx ON sessions (expires_at);
+                    CREATE INDEX IF NOT EXISTS sessions_user_id_idx ON sessions (user_id);
+                """)
+                conn.commit()
+        _table_ready = True
+
+
+def create_session(user_id, username, role):
+    """签发新会话令牌并写入 sessions 表"""
+    ensure_sessions_table()
+    _ensure_maintenance()
+
+    raw = secrets.token_urlsafe(24)
+    token = f"{raw}.{_sign(raw)}"
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=get_settings().session_ttl_hours)
+
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO sessions (token_hash, user_id, expires_at) VALUES (%s, %s, %s)",
+                (_token_hash(token), user_id, expires_at)
+            )
+            conn.commit()
+
+    with _cache_lock:
+        _cache[_token_hash(token)] = {
+            "user_id": user_id, "username": username, "role": role, "expires_at": expires_at
+        }
+    return token
+
+
+def validate_session(token):
+    """
+    校验令牌，返回 {"user_id", "username", "role", "expires_at"}，无效返回 None
+    常见情况下只是一次内存查找
+    """
+    if not token or "." not in token:
+        return None
+    raw, signature = token.rsplit(".", 1)
+    if not hmac.compare_digest(signature, _sign(raw)):
+        return None
+
+    key = _token_hash(token)
+    now = datetime.now(timezone.utc)
+    with _cache_lock:
+        if key in _pending_revocations:
+            return None
+        if key in _cache:
+            session = _cache[key]
+            if session is None or session["expires_at"] <= now:
+                return None
+            return session
+
+    ensure_sessions_table()
+    _ensure_maintenance()
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT s.user_id, u.username, u.role, s.expires_at
+                FROM sessions s
+                JOIN users u ON u.id = s.user_id
+                WHERE s.token_hash = %s AND s.revoked_at IS NULL AND s.expires_at > NOW()
+            """, (key,))
+            row = cur.fetchone()
+
+    session = None
+    if row:
+        user_id, username, role, expires_at = row
+        session = {"user_id": user_id, "username": username, "role": role, "expires_at": expires_at}
+
+    # 无效令牌也缓存（None），避免反复查库
+    with _cache_lock:
+        _cache[key] = session if key not in _pending_revocations else None
+    return session
+
+
+def revoke_session(token):
+    """吊销会话：本进程立即生效并同步写库（单行更新），写库失败时交给后台线程重试"""
+    if not token:
+        return
+    key = _token_hash(token)
+    with _cache_lock:
+        _cache[key] = None
+
+    try:
+        ensure_sessions_table()
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE sessions SET revoked_at = NOW() WHERE token_hash = %s AND revoked_at IS NULL",
+                    (key,)
+                )
+                conn.commit()
+    except Exception as e:
+        print(f"[会话吊销异常] 稍后重试: {e}")
+        with _cache_lock:
+            _pending_revocations.add(key)
+        _ensure_maintenance()
+
+
+def flush_session_maintenance():
+    """批量写入待吊销的会话并删除已过期会话"""
+    with _cache_lock:
+        revoked = list(_pending_revocations)
+        _pending_revocations.clear()
+
+    try:
+        ensure_sessions_table()
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                if revoked:
+                    cur.execute(
+                        "UPDATE sessions SET revoked_at = NOW() WHERE token_hash = ANY(%s) AND revoked_at IS NULL",
+                        (revoked,)
+                    )
+                cur.execute("DELETE FROM sessions WHERE expires_at <= NOW() OR revoked_at < NOW() - INTERVAL '1 day'")
+                conn.commit()
+    except Exception as e:
+        # 写库失败时放回队列，下个周期重试
+        with _cache_lock:
+            _pending_revocations.update(revoked)
+        print(f"[会话维护异常] {e}")
+
+
+@atexit.register
+def _flush_pending_revocations():
+    """进程退出前补写尚未落库的吊销"""
+    if _pending_revocations:
+        flush_session_maintenance()
+
+
+def _maintenance_loop():
+    while True:
+        time.sleep(MAINTENANCE_INTERVAL_SECONDS)
+        flush_session_maintenance()
+
+
+def _ensure_maintenance():
+    global _maintenance_thread
+    with _maintenance_lock:
+        if _maintenance_thread is None or not _maintenance_thread.is_alive():
+            _maintenance_thread = threading.Thread(target=_maintenance_loop, name="session-maintenance", daemon=True)
+            _maintenance_thread.start()
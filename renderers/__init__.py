@@ -2,4 +2,20 @@
 from .polymarket_renderer import display_event as polymarket_display
 from .default_renderer import display_event as default_display
 
-__all__ = ['polymarket_display', 'default_display']
\ No newline at end of file
+# 渲染器名称 → 渲染函数（数据源通过 DataSource.renderer 声明使用哪个渲染器）
+RENDERERS = {
+    "polymarket": polymarket_display,
+    "default": default_display,
+}
+
+
+def register_renderer(name, display_func):
+    RENDERERS[name] = display_func
+    return display_func
+
+
+def get_renderer(name):
+    return RENDERERS.get(name)
+
+
+__all__ = ['polymarket_display', 'default_display', 'register_renderer', 'get_renderer']
@@ -2,10 +2,11 @@
 
 import streamlit as st
 import json
-import pandas as pd
 import logging
 from datetime import datetime
 
+from utils.icon_cache import ICON_SIZE, icon_source
+
 logger = logging.getLogger(__name__)
 
 _DESCRIPTION_COUNTER = 0
@@ -47,6 +48,8 @@ def format_date(date_str):
 
 def create_volume_dataframe(vol_24hr, vol_1wk, vol_1mo, vol_1yr):
     """创建用于 st.bar_chart 的 DataFrame"""
+    import pandas as pd  # 延迟导入，避免拖慢冷启动
+
     data = {
         "时间段": ["24小时", "1周", "1月", "1年"],
         "成交量 (USD)": [vol_24hr, vol_1wk, vol_1mo, vol_1yr]
@@ -84,7 +87,7 @@ def display_market(market):
     col1, col2 = st.columns([1, 3])
     with col1:
         if icon:
-            st.image(icon, width=80)
+            st.image(icon_source(icon), width=ICON_SIZE)
     with col2:
         st.markdown(f"💰 最新成交价：**${last_price:.2f}**")
 
@@ -139,7 +142,7 @@ def display_event(event_data):
         col1, col2 = st.columns([1, 4])
         with col1:
             if icon:
-                st.image(icon, width=80)
+                st.image(icon_source(icon), width=ICON_SIZE)
         with col2:
             status_icon = "🟢" if not closed else "🔴"
             st.markdown(f"### {status_icon} 事件状态：{'已关闭' if closed else '进行中'}")
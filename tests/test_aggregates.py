@@ -0,0 +1,25 @@
+# tests/test_aggregates.py
+"""data_sources.aggregates.compute_event_aggregate：概率变动只统计未关闭的市场"""
+from data_sources.aggregates import compute_event_aggregate
+
+
+def _market(name, price, closed=False):
+    return {"groupItemTitle": name, "outcomePrices": f'["{price}", "{1 - price}"]', "closed": closed}
+
+
+def test_closed_markets_do_not_count_as_movers():
+    event = {"slug": "e", "markets": [_market("A", 0.6), _market("B", 0.9, closed=True)]}
+    agg = compute_event_aggregate(event, {"A": 0.5, "B": 0.5})
+
+    assert agg["top_mover_market"] == "A"
+    assert abs(agg["max_prob_change"] - 0.1) < 1e-9
+    assert agg["market_prices"] == {"A": 0.6}
+    assert agg["active_markets"] == 1
+
+
+def test_unchanged_prices_have_no_mover():
+    event = {"slug": "e", "markets": [_market("A", 0.6)]}
+    agg = compute_event_aggregate(event, {"A": 0.6})
+
+    assert agg["top_mover_market"] is None
+    assert agg["max_prob_change"] == 0.0
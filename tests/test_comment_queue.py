@@ -0,0 +1,24 @@
+# tests/test_comment_queue.py
+"""modules.comment_queue：写入持续失败的评论在重试耗尽后记为放弃，且不影响其他提交"""
+from modules import comment_queue
+
+
+def test_abandoned_after_retries(monkeypatch):
+    calls = []
+
+    def failing_write(batch):
+        calls.append(len(batch))
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(comment_queue, "write_batch", failing_write)
+    monkeypatch.setattr(comment_queue, "MAX_RETRIES", 1)
+    monkeypatch.setattr(comment_queue.time, "sleep", lambda seconds: None)
+
+    key, is_new = comment_queue.enqueue_comment(1, "hello", event_title="t")
+    assert is_new
+    assert comment_queue.flush(timeout=5)
+
+    assert len(calls) == 2
+    assert comment_queue.abandoned_keys([key, "other"]) == {key}
+    # 放弃后同一幂等键可以重新提交
+    assert key not in comment_queue._recent_keys
@@ -0,0 +1,114 @@
+# tests/test_icon_cache.py
+"""utils.icon_cache：对本地 http.server 桩服务验证下载一次、缩放到 80px、按访问时间淘汰"""
+import io
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from utils import icon_cache
+from utils.settings import get_settings
+
+
+def _png(width, height):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def icon_server():
+    """返回 (base_url, 请求计数)，每个路径返回一张 300x200 的 PNG，/missing 返回 404"""
+    body = _png(300, 200)
+    hits = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits[self.path] = hits.get(self.path, 0) + 1
+            if self.path == "/missing":
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", hits
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("ICON_CACHE_DIR", str(tmp_path / "icons"))
+    get_settings.cache_clear()
+    icon_cache._failed.clear()
+    yield tmp_path / "icons"
+    get_settings.cache_clear()
+
+
+def test_cache_icon_downloads_once_and_resizes(icon_server):
+    base, hits = icon_server
+    url = f"{base}/a.png"
+
+    path = icon_cache.cache_icon(url)
+    assert path and os.path.exists(path)
+    assert icon_cache.cache_icon(url) == path
+    assert hits["/a.png"] == 1
+
+    with Image.open(path) as image:
+        assert max(image.size) == icon_cache.ICON_SIZE
+        assert image.size == (80, 53)
+
+
+def test_cache_icon_failure_returns_none(icon_server):
+    base, _ = icon_server
+    url = f"{base}/missing"
+    assert icon_cache.cache_icon(url) is None
+    assert icon_cache.cached_icon_path(url) is None
+    assert url in icon_cache._failed
+
+
+def test_evict_removes_least_recently_used(icon_server, cache_dir):
+    base, _ = icon_server
+    urls = [f"{base}/{name}.png" for name in ("old", "mid", "new")]
+    paths = [icon_cache.cache_icon(url) for url in urls]
+
+    now = time.time()
+    for age, path in zip((300, 200, 100), paths):
+        os.utime(path, (now - age, now - age))
+    # 访问 old 会刷新其 mtime，淘汰顺序变为 mid 先走
+    assert icon_cache.cached_icon_path(urls[0]) == paths[0]
+
+    sizes = [os.path.getsize(path) for path in paths]
+    removed = icon_cache.evict(max_bytes=sum(sizes) - 1)
+
+    assert removed == 1
+    assert not os.path.exists(paths[1])
+    assert os.path.exists(paths[0]) and os.path.exists(paths[2])
+    assert icon_cache.evict(max_bytes=0) == 2
+    assert os.listdir(cache_dir) == []
+
+
+def test_icon_source_schedules_download_on_miss(icon_server):
+    base, hits = icon_server
+    url = f"{base}/lazy.png"
+
+    assert icon_cache.icon_source(url) == url
+    deadline = time.monotonic() + 5
+    while icon_cache.cached_icon_path(url) is None and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert icon_cache.icon_source(url) == icon_cache.cached_icon_path(url)
+    assert hits["/lazy.png"] == 1
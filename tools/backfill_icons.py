@@ -0,0 +1,43 @@
+# tools/backfill_icons.py
+"""
+为 contents 中已有的事件（包括已关闭、不会再被刷新的事件）补齐本地图标缓存。
+已缓存的图标会跳过，可随时重复运行；目录超过 ICON_CACHE_MAX_MB 时仍按访问时间淘汰。
+
+用法：python -m tools.backfill_icons [--batch-size 500] [--workers 8]
+"""
+import argparse
+from contextlib import closing
+
+from tqdm import tqdm
+
+from utils.db_utils import get_db_connection
+from utils.icon_cache import prefetch_icons
+
+
+def main():
+    parser = argparse.ArgumentParser(description="补齐存量事件的图标缓存")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批读取的事件数")
+    parser.add_argument("--workers", type=int, default=8, help="并发下载数")
+    args = parser.parse_args()
+
+    downloaded = 0
+    with closing(get_db_connection()) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM contents WHERE lists IS NOT NULL")
+            total = cur.fetchone()[0]
+
+        with conn.cursor(name="icon_backfill") as cur, tqdm(total=total, unit="事件") as bar:
+            cur.itersize = args.batch_size
+            cur.execute("SELECT lists FROM contents WHERE lists IS NOT NULL")
+            while True:
+                rows = cur.fetchmany(args.batch_size)
+                if not rows:
+                    break
+                downloaded += prefetch_icons((row[0] for row in rows), max_workers=args.workers)
+                bar.update(len(rows))
+
+    print(f"[图标补齐完成] 下载 {downloaded} 个图标")
+
+
+if __name__ == "__main__":
+    main()
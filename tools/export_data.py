@@ -0,0 +1,196 @@
+# tools/export_data.py
+"""
+离线分析导出：以恒定内存把 contents（按 lists.markets 展开为每个市场一行）和 comments 流式导出。
+
+- CSV：使用 COPY (...) TO STDOUT 由服务端直接流式输出
+- Parquet：使用服务端命名游标分批读取，按列类型 OID 构造固定 schema，逐批写入 row group
+- 增量：--since 只导出 updated_time（contents）/ created_at（comments）不早于「水位线 - --lag」的行，
+  结束时输出本次导出的新水位线，供下次使用
+
+增量语义是至少一次（at-least-once）：时间戳在事务提交前就已写入，
+导出快照之后才提交、时间戳却早于水位线的行（慢事务、评论后台批量写入）会被下一次导出漏掉，
+因此每次增量都向前回看 --lag（默认 5 分钟）。代价是窗口内的行会在相邻两次导出中重复出现，
+分析端需要按主键去重：contents 按 (slug, market_index) 保留 updated_time 最新的一行，comments 按 id。
+提交耗时超过 --lag 的事务仍可能漏掉，必要时调大 --lag 或定期做一次全量导出。
+
+用法：
+    python -m tools.export_data contents --format csv --output contents.csv
+    python -m tools.export_data comments --format parquet --output comments.parquet --since 2025-01-01T00:00:00Z
+"""
+import argparse
+import sys
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from utils.db_utils import get_db_connection
+
+CONTENTS_QUERY = """
+    SELECT
+        c.slug,
+        c.title,
+        c.apis AS source,
+        c.categories,
+        c.sub_category,
+        c.updated_time,
+        (e.lists ->> 'closed')::boolean AS event_closed,
+        e.lists ->> 'endDate' AS event_end_date,
+        m.ordinality - 1 AS market_index,
+        m.market ->> 'groupItemTitle' AS market_title,
+        (m.market ->> 'closed')::boolean AS market_closed,
+        NULLIF(m.market ->> 'volume', '')::double precision AS volume,
+        NULLIF(m.market ->> 'liquidity', '')::double precision AS liquidity,
+        NULLIF(m.market ->> 'volume24hr', '')::double precision AS volume24hr,
+        NULLIF(m.market ->> 'volume1wk', '')::double precision AS volume1wk,
+        NULLIF(m.market ->> 'bestBid', '')::double precision AS best_bid,
+        NULLIF(m.market ->> 'bestAsk', '')::double precision AS best_ask,
+        NULLIF(m.market ->> 'lastTradePrice', '')::double precision AS last_trade_price,
+        m.market ->> 'outcomePrices' AS outcome_prices
+    FROM contents c
+    CROSS JOIN LATERAL (SELECT c.lists::jsonb AS lists) e
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(e.lists -> 'markets') = 'array' THEN e.lists -> 'markets' ELSE '[]'::jsonb END
+    ) WITH ORDINALITY AS m (market, ordinality)
+    WHERE %(since)s::timestamptz IS NULL OR c.updated_time >= %(since)s::timestamptz - %(lag)s::interval
+    ORDER BY c.updated_time, c.slug, m.ordinality
+"""
+
+COMMENTS_QUERY = """
+    SELECT c.id, c.user_id, u.username, c.title, c.parent_id, c.content, c.likes, c.created_at
+    FROM comments c
+    LEFT JOIN users u ON u.id = c.user_id
+    WHERE %(since)s::timestamptz IS NULL OR c.created_at >= %(since)s::timestamptz - %(lag)s::interval
+    ORDER BY c.created_at, c.id
+"""
+
+WATERMARK_QUERY = {
+    "contents": "SELECT MAX(updated_time) FROM contents WHERE %(since)s::timestamptz IS NULL OR updated_time > %(since)s::timestamptz",
+    "comments": "SELECT MAX(created_at) FROM comments WHERE %(since)s::timestamptz IS NULL OR created_at > %(since)s::timestamptz",
+}
+
+# 增量导出向前回看的时长，覆盖导出时尚未提交的事务
+DEFAULT_LAG = timedelta(minutes=5)
+
+QUERIES = {
+    "contents": CONTENTS_QUERY,
+    "comments": COMMENTS_QUERY,
+}
+
+
+def export_csv(conn, query, params, output):
+    """COPY 流式导出为 CSV（服务端逐块推送，客户端不缓存结果集）"""
+    with conn.cursor() as cur:
+        sql = cur.mogrify(query, params).decode("utf-8")
+        cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", output)
+        return cur.rowcount
+
+
+# PostgreSQL 类型 OID → Arrow 类型（覆盖导出查询中出现的列类型）
+_ARROW_TYPES = {
+    16: "bool_",          # boolean
+    20: "int64",          # bigint
+    21: "int16",          # smallint
+    23: "int32",          # integer
+    25: "string",         # text
+    1043: "string",       # varchar
+    700: "float32",       # real
+    701: "float64",       # double precision
+    1184: "timestamptz",  # timestamp with time zone
+    1114: "timestamp",    # timestamp without time zone
+}
+
+
+def arrow_schema(description):
+    """按游标列的类型 OID 构造固定 schema，避免按首批数据推断（整列为 NULL 时会被推断成 null 类型）"""
+    import pyarrow as pa
+
+    fields = []
+    for column in description:
+        kind = _ARROW_TYPES.get(column.type_code)
+        if kind is None:
+            raise ValueError(f"列 {column.name} 的类型 OID {column.type_code} 没有对应的 Parquet 类型")
+        if kind == "timestamptz":
+            arrow_type = pa.timestamp("us", tz="UTC")
+        elif kind == "timestamp":
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = getattr(pa, kind)()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def export_parquet(conn, query, params, path, chunk_size):
+    """命名游标分批读取，每批按固定 schema 写成一个 row group（无数据时也写出只含 schema 的文件）"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows_written = 0
+    writer = None
+    with conn.cursor(name="export_cursor") as cur:
+        cur.itersize = chunk_size
+        cur.execute(query, params)
+        try:
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                # 命名游标在第一次 fetch 之后才有 description
+                if writer is None:
+                    schema = arrow_schema(cur.description)
+                    writer = pq.ParquetWriter(path, schema)
+                if not rows:
+                    break
+                table = pa.Table.from_pylist([dict(zip(schema.names, row)) for row in rows], schema=schema)
+                writer.write_table(table)
+                rows_written += len(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+    return rows_written
+
+
+def export_table(table, fmt, output, since=None, chunk_size=50_000, lag=DEFAULT_LAG):
+    """导出一张表，返回 (行数, 新水位线)；增量时回看 lag，窗口内的行可能与上次导出重复"""
+    params = {"since": since, "lag": lag}
+    with closing(get_db_connection()) as conn:
+        # 可重复读快照：导出数据与水位线一致
+        conn.set_session(readonly=True, isolation_level="REPEATABLE READ")
+
+        with conn.cursor() as cur:
+            cur.execute(WATERMARK_QUERY[table], params)
+            watermark = cur.fetchone()[0]
+
+        if fmt == "csv":
+            if output == "-":
+                rows = export_csv(conn, QUERIES[table], params, sys.stdout)
+            else:
+                with open(output, "w", encoding="utf-8", newline="") as f:
+                    rows = export_csv(conn, QUERIES[table], params, f)
+        else:
+            rows = export_parquet(conn, QUERIES[table], params, output, chunk_size)
+
+        conn.rollback()
+
+    return rows, watermark or since
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式导出 contents / comments")
+    parser.add_argument("table", choices=sorted(QUERIES))
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--output", required=True, help="输出文件路径（CSV 可用 - 表示标准输出）")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="增量水位线（ISO 时间），只导出之后（含回看窗口）更新/创建的行")
+    parser.add_argument("--lag", type=float, default=DEFAULT_LAG.total_seconds() / 60,
+                        help="增量导出向前回看的分钟数，窗口内的行会与上次导出重复，需按主键去重（默认 5）")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    if args.format == "parquet" and args.output == "-":
+        parser.error("Parquet 格式不支持输出到标准输出")
+
+    rows, watermark = export_table(args.table, args.format, args.output, args.since, args.chunk_size,
+                                   lag=timedelta(minutes=args.lag))
+    print(f"[导出完成] {args.table}: {rows} 行，新水位线 {watermark.isoformat() if watermark else '无'}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# tools/import_events.py
+"""
+批量导入 / 初始化 contents 中的事件。
+
+用法：
+    # 按 slug 列表导入（文件每行一个 slug）
+    python -m tools.import_events --category 政治 --slugs-file slugs.txt --checkpoint import.ckpt
+
+    # 按 Gamma API 标签查询导入（可附加任意查询参数）
+    python -m tools.import_events --category 体育 --sub-category NBA --tag nba --param closed=false
+
+中断后使用同一个 --checkpoint 文件重新运行即可从断点继续。
+"""
+import argparse
+import sys
+from contextlib import closing
+
+from tqdm import tqdm
+
+from data_sources import get_source
+from data_sources.ingest import Checkpoint, import_query, import_slugs
+from utils.db_utils import get_db_connection
+
+
+def _read_slugs(args):
+    slugs = list(args.slug or [])
+    if args.slugs_file:
+        with open(args.slugs_file, encoding="utf-8") as f:
+            slugs.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return slugs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入事件到 contents")
+    parser.add_argument("--source", default="polymarket")
+    parser.add_argument("--category", required=True, help="写入 contents.categories")
+    parser.add_argument("--sub-category", default=None, help="写入 contents.sub_category")
+    parser.add_argument("--slug", action="append", help="要导入的 slug（可重复）")
+    parser.add_argument("--slugs-file", help="slug 列表文件，每行一个")
+    parser.add_argument("--tag", help="Gamma API 标签（tag_slug）")
+    parser.add_argument("--param", action="append", default=[], metavar="KEY=VALUE",
+                        help="附加的 Gamma API 查询参数（可重复）")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批写入的事件数")
+    parser.add_argument("--page-size", type=int, default=100, help="按查询导入时每页事件数")
+    parser.add_argument("--max-events", type=int, default=None, help="按查询导入时的事件数上限")
+    parser.add_argument("--checkpoint", help="检查点文件路径（用于断点续传）")
+    args = parser.parse_args()
+
+    source = get_source(args.source)
+    if source is None:
+        parser.error(f"未注册的数据源: {args.source}")
+
+    slugs = _read_slugs(args)
+    query = dict(param.split("=", 1) for param in args.param)
+    if args.tag:
+        query["tag_slug"] = args.tag
+    if not slugs and not query:
+        parser.error("需要提供 --slug / --slugs-file 或 --tag / --param")
+
+    checkpoint = Checkpoint(args.checkpoint)
+
+    with closing(get_db_connection()) as conn:
+        if slugs:
+            with tqdm(total=len(set(slugs)), initial=len(checkpoint.done & set(slugs)), unit="事件") as bar:
+                imported, failed = import_slugs(
+                    conn, source, slugs, args.category, args.sub_category,
+                    batch_size=args.batch_size, checkpoint=checkpoint, progress=bar.update
+                )
+            print(f"[导入完成] 成功 {imported}，失败 {len(failed)}")
+            for slug in failed:
+                print(f"  失败: {slug}", file=sys.stderr)
+
+        if query:
+            with tqdm(total=args.max_events, initial=checkpoint.offset, unit="事件") as bar:
+                imported = import_query(
+                    conn, source, query, args.category, args.sub_category,
+                    page_size=args.page_size, max_events=args.max_events,
+                    checkpoint=checkpoint, progress=bar.update
+                )
+            print(f"[导入完成] 按查询导入 {imported} 个事件（offset={checkpoint.offset}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+# tools/load_test.py
+"""
+并发压测：在子进程中 `streamlit run app.py` 启动真实服务端，每个虚拟用户是一个 websocket 会话
+（tools.streamlit_client，与浏览器同一协议），模拟观众 / 评论者 / 点赞者 / 管理员；
+卡片内交互按真实的 fragment 局部重跑执行和计时。
+Gamma API 由本地 HTTP 桩服务代替，数据库使用 DATABASE_URL 指向的本地 Postgres。
+
+输出：
+- 各类操作的重跑耗时分位数（p50 / p90 / p99 / max）、错误数与每次下发的数据量
+- 服务端进程的数据库连接数（pg_stat_activity 中 application_name 为 SERVER_APP_NAME 的连接，
+  压测进程自身签发令牌 / 采样用的连接不计入）、服务端进程线程数的平均 / 峰值，
+  以及相对压测开始前空闲基线的增量
+- 上游（桩服务）请求总数与速率
+
+用法：
+    python -m tools.load_test --events 120 --viewers 8 --commenters 2 --likers 2 --admins 1 --duration 60
+    python -m tools.load_test --cleanup
+"""
+import argparse
+import json
+import os
+import random
+import secrets
+import statistics
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from tools.streamlit_client import StreamlitSession, start_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CATEGORY = "loadtest"
+USER_PREFIX = "loadtest_"
+
+# 服务端子进程通过 PGAPPNAME（libpq 读取）标记自己的数据库连接，采样时据此与压测进程的连接区分
+SERVER_APP_NAME = "loadtest-server"
+
+
+def _pixel_png():
+    """生成 1x1 透明 PNG，用作桩服务返回的图标"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(b"\x00\x00\x00\x00\x00"))
+        + chunk(b"IEND", b"")
+    )
+
+
+PIXEL_PNG = _pixel_png()
+
+
+# =================== Gamma API 桩服务 ===================
+
+def make_stub_event(index, base_url):
+    """确定性地生成一个 Gamma 事件（原始字段），成交量与价格随时间抖动以产生概率变化"""
+    rng = random.Random(index * 7919 + int(time.time() // 60))
+    markets = []
+    for m in range(rng.randint(1, 6)):
+        yes = round(rng.random(), 3)
+        markets.append({
+            "icon": f"{base_url}/icons/{index}-{m}.png",
+            "volume": str(rng.uniform(1e3, 1e7)),
+            "liquidity": str(rng.uniform(1e3, 1e6)),
+            "bestBid": yes - 0.01,
+            "bestAsk": yes + 0.01,
+            "lastTradePrice": yes,
+            "closed": rng.random() < 0.1,
+            "outcomePrices": json.dumps([str(yes), str(round(1 - yes, 3))]),
+            "groupItemTitle": f"市场 {m + 1}",
+            "volume24hr": rng.uniform(0, 2e6),
+            "volume1wk": rng.uniform(0, 5e6),
+            "volume1mo": rng.uniform(0, 1e7),
+            "volume1yr": rng.uniform(0, 5e7),
+        })
+    now = datetime.now(timezone.utc)
+    return {
+        "slug": f"loadtest-event-{index}",
+        "title": f"压测事件 {index}",
+        "icon": f"{base_url}/icons/{index}.png",
+        "description": "load test",
+        "closed": index % 10 == 0,
+        "startDate": (now - timedelta(days=30)).isoformat(),
+        "endDate": (now + timedelta(hours=rng.randint(1, 24 * 60))).isoformat(),
+        "volume": sum(float(m["volume"]) for m in markets),
+        "liquidity": sum(float(m["liquidity"]) for m in markets),
+        "volume24hr": sum(m["volume24hr"] for m in markets),
+        "volume1wk": sum(m["volume1wk"] for m in markets),
+        "volume1mo": sum(m["volume1mo"] for m in markets),
+        "volume1yr": sum(m["volume1yr"] for m in markets),
+        "markets": markets,
+    }
+
+
+class StubGammaServer:
+    """本地 Gamma API 桩：/events?slug=...、/events?limit=&offset=、/icons/*.png，并统计请求数"""
+
+    def __init__(self, total_events, latency=0.05):
+        self.total_events = total_events
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                time.sleep(stub.latency)
+
+                url = urlparse(self.path)
+                if url.path.startswith("/icons/"):
+                    return self._send(200, PIXEL_PNG, "image/png")
+                if url.path != "/events":
+                    return self._send(404, b"{}", "application/json")
+
+                query = parse_qs(url.query)
+                if "slug" in query:
+                    slug = query["slug"][0]
+                    index = int(slug.rsplit("-", 1)[-1]) if slug.startswith("loadtest-event-") else -1
+                    events = [make_stub_event(index, stub.base_url)] if 0 <= index < stub.total_events else []
+                else:
+                    offset = int(query.get("offset", ["0"])[0])
+                    limit = int(query.get("limit", ["100"])[0])
+                    end = min(offset + limit, stub.total_events)
+                    events = [make_stub_event(i, stub.base_url) for i in range(offset, end)]
+                self._send(200, json.dumps(events).encode("utf-8"), "application/json")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="stub-gamma", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+# =================== 数据准备 ===================
+
+PERSONAS = ["viewer", "commenter", "liker", "admin"]
+
+
+def seed(conn, stub, total_events, counts):
+    """写入压测事件（updated_time 设为过期以触发刷新）与各角色的压测用户，返回 {persona: [(user_id, username)]}"""
+    from data_sources.ingest import upsert_events
+    from data_sources.polymarket import extract_relevant_fields
+
+    events = [extract_relevant_fields(make_stub_event(i, stub.base_url)) for i in range(total_events)]
+    stale = datetime.now(timezone.utc) - timedelta(days=2)
+    for i in range(0, len(events), 500):
+        upsert_events(conn, "polymarket", events[i:i + 500], CATEGORY, updated_time=stale)
+
+    users = {}
+    with conn.cursor() as cur:
+        for persona in PERSONAS:
+            users[persona] = []
+            role = "admin" if persona == "admin" else "user"
+            for i in range(counts[persona]):
+                username = f"{USER_PREFIX}{persona}_{i}"
+                cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+                row = cur.fetchone()
+                if row is None:
+                    cur.execute(
+                        "INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s) RETURNING id",
+                        (username, "!", role)
+                    )
+                    row = cur.fetchone()
+                users[persona].append((row[0], username))
+        conn.commit()
+    return users
+
+
+def cleanup(conn):
+    """删除压测写入的事件、评论、聚合、会话与用户"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            DELETE FROM comments
+            WHERE user_id IN (SELECT id FROM users WHERE username LIKE %s)
+               OR title IN (SELECT title FROM contents WHERE categories = %s)
+        """, (f"{USER_PREFIX}%", CATEGORY))
+        # 以下表由应用首次使用时创建，可能尚不存在
+        for table in ("event_aggregates", "category_aggregates"):
+            cur.execute("SELECT to_regclass(%s)", (table,))
+            if cur.fetchone()[0]:
+                cur.execute(f"DELETE FROM {table} WHERE categories = %s", (CATEGORY,))
+        cur.execute("SELECT to_regclass('sessions')")
+        if cur.fetchone()[0]:
+            cur.execute("DELETE FROM sessions WHERE user_id IN (SELECT id FROM users WHERE username LIKE %s)",
+                        (f"{USER_PREFIX}%",))
+        cur.execute("DELETE FROM contents WHERE categories = %s", (CATEGORY,))
+        cur.execute("DELETE FROM users WHERE username LIKE %s", (f"{USER_PREFIX}%",))
+        conn.commit()
+
+
+# =================== 虚拟用户 ===================
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.sizes = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, action, seconds, size=None, error=None):
+        with self._lock:
+            self.latencies.setdefault(action, []).append(seconds)
+            if size is not None:
+                self.sizes.setdefault(action, []).append(size)
+            if error:
+                self.errors.setdefault(action, []).append(error)
+
+
+def run_session(persona, user, base_url, recorder, stop_at, think_time, timeout):
+    from modules.sessions import create_session
+
+    user_id, username = user
+    role = "admin" if persona == "admin" else "user"
+    # 每次运行都会校验会话令牌，这里签发真实令牌，通过 URL 参数带给服务端，与浏览器刷新页面时相同
+    token = create_session(user_id, username, role)
+
+    try:
+        session = StreamlitSession(base_url, f"sid={token}", timeout=timeout)
+    except Exception as e:
+        recorder.record("connect", 0.0, error=str(e))
+        return
+
+    def timed(action, step):
+        start = time.perf_counter()
+        seen = len(session.exceptions)
+        size, error = None, None
+        try:
+            size = step().bytes
+            if len(session.exceptions) > seen:
+                error = session.exceptions[-1]
+        except Exception as e:
+            error = str(e)
+        recorder.record(action, time.perf_counter() - start, size, error)
+
+    def click_random(prefix, action):
+        """随机点击前 20 个可用按钮中的一个，没有则返回 False"""
+        buttons = session.buttons(prefix)
+        if not buttons:
+            return False
+        key = random.choice(buttons[:20]).key
+        timed(action, lambda: session.click(key))
+        return True
+
+    with session:
+        timed("initial_load", session.run)
+
+        while time.monotonic() < stop_at:
+            time.sleep(random.uniform(0.5, 1.5) * think_time)
+
+            if persona == "commenter":
+                inputs = [w for w in session.widgets.values()
+                          if w.kind == "text_area" and w.key.startswith("comment_input_")]
+                if inputs:
+                    title = random.choice(inputs[:20]).key[len("comment_input_"):]
+                    text = f"压测评论 {username} {time.time():.3f}"
+                    timed("comment", lambda: session.submit_form(f"comment_form_{title}",
+                                                                 {f"comment_input_{title}": text}))
+                    continue
+            elif persona == "liker":
+                if click_random("like_", "like"):
+                    continue
+            elif persona == "admin":
+                if click_random("refresh_", "admin_refresh"):
+                    continue
+
+            timed("view_rerun", session.run)
+
+
+# =================== 指标采样 ===================
+
+def _thread_count(pid):
+    """读取 /proc 中进程的线程数，非 Linux 环境返回 None"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def sample_metrics(stub, server_pid, stop_event, samples, interval=1.0):
+    """采样服务端进程的线程数与数据库连接数（只计服务端子进程的连接）；stop_event 为 None 时只采一次"""
+    from utils.db_utils import get_db_connection
+
+    with closing(get_db_connection()) as conn:
+        conn.autocommit = True
+        while True:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT count(*) FROM pg_stat_activity
+                    WHERE datname = current_database() AND application_name = %s
+                """, (SERVER_APP_NAME,))
+                db_connections = cur.fetchone()[0]
+            samples.append({
+                "time": time.monotonic(),
+                "db_connections": db_connections,
+                "threads": _thread_count(server_pid),
+                "upstream_requests": stub.requests,
+            })
+            if stop_event is None or stop_event.wait(interval):
+                return
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(recorder, samples, baseline, stub, elapsed):
+    print(f"\n{'操作':<16}{'次数':>8}{'错误':>8}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}{'KB/次':>10}")
+    for action, values in sorted(recorder.latencies.items()):
+        ms = [v * 1000 for v in values]
+        sizes = recorder.sizes.get(action)
+        kb = f"{statistics.mean(sizes) / 1024:>10.1f}" if sizes else f"{'-':>10}"
+        print(f"{action:<16}{len(ms):>8}{len(recorder.errors.get(action, [])):>8}"
+              f"{_percentile(ms, 50):>10.0f}{_percentile(ms, 90):>10.0f}"
+              f"{_percentile(ms, 99):>10.0f}{max(ms):>10.0f}{kb}")
+
+    if samples:
+        for name, field in (("数据库连接数", "db_connections"), ("服务端线程数", "threads")):
+            values = [s[field] for s in samples if s[field] is not None]
+            if not values:
+                print(f"{name}：无法采集")
+                continue
+            idle = baseline[field]
+            print(f"{name}：平均 {statistics.mean(values):.1f}，峰值 {max(values)}，"
+                  f"空闲基线 {idle}，峰值增量 +{max(values) - idle}")
+    print(f"上游请求：    共 {stub.requests} 次，{stub.requests / elapsed:.2f} 次/秒")
+
+    for action, errors in sorted(recorder.errors.items()):
+        print(f"\n[{action}] 错误示例（共 {len(errors)} 个）：{errors[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发会话压测")
+    parser.add_argument("--events", type=int, default=120, help="写入的压测事件数")
+    parser.add_argument("--viewers", type=int, default=8)
+    parser.add_argument("--commenters", type=int, default=2)
+    parser.add_argument("--likers", type=int, default=2)
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=60, help="压测时长（秒）")
+    parser.add_argument("--think-time", type=float, default=2.0, help="每个会话两次操作间的平均间隔（秒）")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="桩服务每个请求的模拟延迟（秒）")
+    parser.add_argument("--timeout", type=float, default=120, help="单次重跑的超时（秒）")
+    parser.add_argument("--cleanup", action="store_true", help="只删除压测数据后退出")
+    args = parser.parse_args()
+
+    stub = StubGammaServer(args.events, latency=args.stub_latency).start()
+    # 必须在任何模块读取配置之前设置；服务端子进程继承这些环境变量：
+    # 采集与图标下载都指向桩服务，且与本进程用同一密钥签发 / 校验会话令牌
+    os.environ["POLYMARKET_API_URL"] = stub.base_url
+    os.environ.setdefault("SESSION_SECRET", secrets.token_hex(16))
+
+    from utils.db_utils import get_db_connection
+
+    with closing(get_db_connection()) as conn:
+        if args.cleanup:
+            cleanup(conn)
+            print("[压测] 已清理压测数据")
+            return
+        counts = {"viewer": args.viewers, "commenter": args.commenters, "liker": args.likers, "admin": args.admins}
+        users = seed(conn, stub, args.events, counts)
+    print(f"[压测] 已写入 {args.events} 个事件，桩服务 {stub.base_url}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server, base_url = start_server(os.path.join(ROOT, "app.py"), ROOT, os.path.join(workdir, "streamlit.log"),
+                                        env={"PGAPPNAME": SERVER_APP_NAME})
+        print(f"[压测] 服务端 {base_url}（pid {server.pid}）")
+        try:
+            run_load(args, stub, users, server.pid, base_url)
+        finally:
+            server.terminate()
+            server.wait()
+    stub.stop()
+
+
+def run_load(args, stub, users, server_pid, base_url):
+    # 会话开始前的空闲基线，用于扣除与负载无关的连接 / 线程
+    idle = []
+    sample_metrics(stub, server_pid, None, idle)
+
+    recorder = Recorder()
+    samples = []
+    stop_event = threading.Event()
+    sampler = threading.Thread(target=sample_metrics, args=(stub, server_pid, stop_event, samples), daemon=True)
+    sampler.start()
+
+    start = time.monotonic()
+    stop_at = start + args.duration
+    sessions = [
+        threading.Thread(
+            target=run_session,
+            args=(persona, user, base_url, recorder, stop_at, args.think_time, args.timeout),
+            name=f"session-{persona}-{i}",
+            daemon=True,
+        )
+        for persona in PERSONAS
+        for i, user in enumerate(users[persona])
+    ]
+    for thread in sessions:
+        thread.start()
+    for thread in sessions:
+        thread.join()
+
+    stop_event.set()
+    sampler.join()
+    report(recorder, samples, idle[0], stub, time.monotonic() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# tools/measure_fragments.py
+"""
+在真实的 Streamlit 服务端上测量卡片内交互的重跑耗时，对比有 / 无 @st.fragment：
+- 复用 tools.load_test 的桩服务与 seed 写入压测事件，并为前几个事件各写一条评论，使点赞 / 回复按钮出现
+- 分别用 app.py 和去掉 @st.fragment 的副本启动 `streamlit run`，通过 websocket 会话（与浏览器同一协议）驱动
+- 管理员会话：刷新不同的过期事件；观众会话：整页重跑、点赞、展开/收起回复
+输出各操作的 p50 / p90 耗时，以及每次重跑下发的消息数和字节数（客户端渲染时间不计入）
+
+用法：python -m tools.measure_fragments [--events 120] [--repeats 5]
+压测数据可用 python -m tools.load_test --cleanup 删除
+"""
+import argparse
+import os
+import secrets
+import statistics
+import tempfile
+from contextlib import closing
+
+from tools.load_test import ROOT, CATEGORY, StubGammaServer, _percentile, seed
+from tools.streamlit_client import StreamlitSession, start_server
+
+VARIANTS = [("有 fragment", True), ("无 fragment", False)]
+ACTIONS = ["initial_load", "full_rerun", "admin_refresh", "like", "reply_toggle"]
+
+
+def seed_comments(conn, user_id, count):
+    """为前 count 个压测事件各写一条评论（已有评论的事件跳过）"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO comments (user_id, content, title, created_at)
+            SELECT %s, '压测种子评论', c.title, NOW()
+            FROM (SELECT title FROM contents WHERE categories = %s ORDER BY slug LIMIT %s) c
+            WHERE NOT EXISTS (SELECT 1 FROM comments m WHERE m.title = c.title)
+        """, (user_id, CATEGORY, count))
+        conn.commit()
+
+
+def _app_script(workdir, fragments):
+    """有 fragment 时直接用 app.py；否则生成去掉 @st.fragment 的副本（scope="fragment" 的重跑改为整页重跑）"""
+    app_path = os.path.join(ROOT, "app.py")
+    if fragments:
+        return app_path
+    with open(app_path, encoding="utf-8") as f:
+        source = f.read()
+    source = source.replace("@st.fragment\n", "").replace('st.rerun(scope="fragment")', "st.rerun()")
+    path = os.path.join(workdir, "app_no_fragment.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    return path
+
+
+def measure(base_url, users, repeats, timeout):
+    """返回 ({操作: [RunResult]}, 页面异常列表)"""
+    from modules.sessions import create_session
+
+    results, exceptions = {}, []
+
+    def record(action, result):
+        results.setdefault(action, []).append(result)
+
+    # 管理员先跑：观众会话会登记后台刷新，之后事件就不再过期
+    admin_id, admin_name = users["admin"][0]
+    with StreamlitSession(base_url, f"sid={create_session(admin_id, admin_name, 'admin')}", timeout) as session:
+        record("initial_load", session.run())
+        for button in session.buttons("refresh_")[:repeats]:
+            record("admin_refresh", session.click(button.key))
+        exceptions.extend(session.exceptions)
+
+    viewer_id, viewer_name = users["viewer"][0]
+    with StreamlitSession(base_url, f"sid={create_session(viewer_id, viewer_name, 'user')}", timeout) as session:
+        record("initial_load", session.run())
+        for i in range(repeats):
+            record("full_rerun", session.run())
+            likes = session.buttons("like_")
+            if likes:
+                record("like", session.click(likes[i % len(likes)].key))
+            replies = session.buttons("btn_toggle_reply_")
+            if replies:
+                record("reply_toggle", session.click(replies[i % len(replies)].key))
+        exceptions.extend(session.exceptions)
+
+    return results, exceptions
+
+
+def report(results):
+    print(f"\n{'方式':<14}{'操作':<16}{'次数':>6}{'p50(ms)':>10}{'p90(ms)':>10}{'消息数':>10}{'KB':>10}")
+    for label, _ in VARIANTS:
+        for action in ACTIONS:
+            runs = results[label].get(action)
+            if not runs:
+                continue
+            ms = [run.seconds * 1000 for run in runs]
+            print(f"{label:<14}{action:<16}{len(runs):>6}{_percentile(ms, 50):>10.0f}{_percentile(ms, 90):>10.0f}"
+                  f"{statistics.mean(run.messages for run in runs):>10.0f}"
+                  f"{statistics.mean(run.bytes for run in runs) / 1024:>10.1f}")
+
+    with_fragment, without_fragment = (results[label] for label, _ in VARIANTS)
+    print()
+    for action in ("admin_refresh", "like", "reply_toggle"):
+        if with_fragment.get(action) and without_fragment.get(action):
+            fast = statistics.median(run.seconds for run in with_fragment[action])
+            slow = statistics.median(run.seconds for run in without_fragment[action])
+            print(f"{action:<16}无 fragment / 有 fragment 中位耗时 = {slow / fast:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="有 / 无 @st.fragment 的卡片交互重跑耗时对比")
+    parser.add_argument("--events", type=int, default=120, help="写入的压测事件数")
+    parser.add_argument("--repeats", type=int, default=5, help="每种操作的次数")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="桩服务每个请求的模拟延迟（秒）")
+    parser.add_argument("--timeout", type=float, default=300, help="单次重跑的超时（秒）")
+    args = parser.parse_args()
+
+    stub = StubGammaServer(args.events, latency=args.stub_latency).start()
+    # 服务端子进程继承这些环境变量：采集指向桩服务，且与本进程用同一密钥签发 / 校验会话令牌
+    os.environ["POLYMARKET_API_URL"] = stub.base_url
+    os.environ.setdefault("SESSION_SECRET", secrets.token_hex(16))
+
+    from utils.db_utils import get_db_connection
+
+    counts = {"viewer": 1, "commenter": 0, "liker": 0, "admin": 1}
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for label, fragments in VARIANTS:
+            # 每种方式前重新写入，使事件重新过期、管理员刷新按钮可用
+            with closing(get_db_connection()) as conn:
+                users = seed(conn, stub, args.events, counts)
+                seed_comments(conn, users["viewer"][0][0], args.repeats)
+
+            process, base_url = start_server(_app_script(workdir, fragments), ROOT,
+                                             os.path.join(workdir, "streamlit.log"))
+            print(f"[测量] {label}：{base_url}，{args.events} 个事件")
+            try:
+                results[label], exceptions = measure(base_url, users, args.repeats, args.timeout)
+            finally:
+                process.terminate()
+                process.wait()
+            if exceptions:
+                print(f"[测量] {label} 页面异常 {len(exceptions)} 个，示例：{exceptions[0]}")
+
+    report(results)
+    stub.stop()
+
+
+if __name__ == "__main__":
+    main()
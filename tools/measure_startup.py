@@ -0,0 +1,85 @@
+# tools/measure_startup.py
+"""
+测量冷启动开销：
+1. 各模块的导入耗时（python -X importtime，独立子进程，保证是冷导入）
+2. 首屏渲染耗时（新进程中用 streamlit AppTest 运行一次 app.py，未登录时即登录页）
+
+用法：python -m tools.measure_startup [--runs 5] [--skip-first-paint]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP_MODULES = [
+    "utils.db_utils",
+    "data_sources",
+    "renderers",
+    "modules.auth",
+    "modules.comments",
+]
+
+
+def measure_import(module):
+    """返回模块冷导入的累计耗时（毫秒）"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # importtime 输出格式: "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    return 0.0
+
+
+FIRST_PAINT_SCRIPT = """
+import sys, time
+from streamlit.testing.v1 import AppTest  # Streamlit 服务端本身已加载，不计入
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+start = time.perf_counter()
+at.run()
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def measure_first_paint():
+    """返回 app.py 在全新进程中首次完整运行的耗时（毫秒），包含应用模块的冷导入"""
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_PAINT_SCRIPT, os.path.join(ROOT, "app.py")],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量导入耗时与首屏渲染耗时")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip-first-paint", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'模块':<24}{'中位数(ms)':>12}{'最小(ms)':>12}")
+    for module in APP_MODULES:
+        samples = [measure_import(module) for _ in range(args.runs)]
+        print(f"{module:<24}{statistics.median(samples):>12.1f}{min(samples):>12.1f}")
+
+    if not args.skip_first_paint:
+        samples = [measure_first_paint() for _ in range(args.runs)]
+        print(f"{'首屏渲染 app.py':<24}{statistics.median(samples):>12.1f}{min(samples):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
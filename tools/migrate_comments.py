@@ -0,0 +1,21 @@
+# tools/migrate_comments.py
+"""
+为 comments 表增加评论写入队列使用的幂等键列与唯一索引（上线前以有 DDL 权限的角色运行一次，可重复运行）。
+页面读评论不再做 DDL；未运行本工具时，评论写入线程会在首次写入时尝试补建。
+
+用法：python -m tools.migrate_comments
+"""
+from contextlib import closing
+
+from modules.comment_queue import migrate_comment_schema
+from utils.db_utils import get_db_connection
+
+
+def main():
+    with closing(get_db_connection()) as conn:
+        migrate_comment_schema(conn)
+    print("[评论迁移完成] comments.idempotency_key 与唯一索引已就绪")
+
+
+if __name__ == "__main__":
+    main()
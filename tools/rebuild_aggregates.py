@@ -0,0 +1,32 @@
+# tools/rebuild_aggregates.py
+"""
+全量重建 event_aggregates / category_aggregates（首次上线回填或修复数据时使用）。
+--sync-only 只做轻量对齐：清理 contents 中已删除的事件、同步被移动事件的分类并重算分类汇总，
+适合在直接修改 contents 之后或定期运行。
+
+用法：python -m tools.rebuild_aggregates [--batch-size 1000] [--sync-only]
+"""
+import argparse
+from contextlib import closing
+
+from data_sources.aggregates import rebuild_aggregates, sync_aggregates
+from utils.db_utils import get_db_connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全量重建排行榜聚合表")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--sync-only", action="store_true", help="只清理 / 同步分类，不重算事件聚合")
+    args = parser.parse_args()
+
+    with closing(get_db_connection()) as conn:
+        if args.sync_only:
+            removed, moved = sync_aggregates(conn)
+            print(f"[聚合同步完成] 删除 {removed} 个已不存在的事件，同步 {moved} 个事件的分类")
+            return
+        total = rebuild_aggregates(conn, batch_size=args.batch_size)
+    print(f"[聚合重建完成] {total} 个事件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# tools/streamlit_client.py
+"""
+无界面的 Streamlit 会话客户端：通过 websocket 与 `streamlit run` 启动的真实服务端通信，
+收发与浏览器相同的 BackMsg / ForwardMsg，因此 fragment 局部重跑、回调、st.rerun 都按真实路径执行。
+
+只实现压测 / 计时需要的部分：启动服务端、发起重跑、点击按钮（自动带上按钮所在的 fragment）、
+按表单提交（提交按钮按所在表单查找）、填写文本框，并记录每次重跑的耗时、下发消息数和字节数。
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import closing
+from dataclasses import dataclass
+
+# 控件 id 形如 "$$ID-<hash>-<key>"，用户指定的 key 在最后
+_ID_KEY_SEPARATOR = "-"
+
+
+def _free_port():
+    with closing(socket.socket()) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(script, root, log_path, timeout=60, env=None):
+    """
+    在子进程中 `streamlit run script`（继承当前环境变量，root 加入 PYTHONPATH，env 为额外的环境变量），
+    健康检查通过后返回 (进程, base_url)
+    """
+    from utils.http_utils import get_http_session
+
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=root, **(env or {}))
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", script,
+             "--server.headless", "true", "--server.port", str(port),
+             "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+            cwd=root, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            if get_http_session().get(f"{base_url}/_stcore/health", timeout=1).ok:
+                return process, base_url
+        except Exception:
+            pass
+        time.sleep(0.5)
+
+    process.kill()
+    with open(log_path, encoding="utf-8") as f:
+        raise RuntimeError(f"streamlit 服务端启动失败：\n{f.read()[-2000:]}")
+
+
+@dataclass
+class RunResult:
+    """一次重跑：从发出请求到收到 script_finished 的耗时与下发量"""
+    seconds: float
+    messages: int
+    bytes: int
+    fragment: bool
+
+
+@dataclass
+class Widget:
+    id: str
+    kind: str
+    label: str
+    fragment_id: str
+    disabled: bool
+    form_id: str = ""
+
+    @property
+    def key(self):
+        return self.id.split(_ID_KEY_SEPARATOR, 2)[-1] if self.id.startswith("$$ID-") else self.id
+
+
+class StreamlitSession:
+    """一个浏览器标签页等价的会话；query_string 用于携带 ?sid= 等 URL 参数"""
+
+    def __init__(self, base_url, query_string="", timeout=120):
+        from websockets.sync.client import connect
+
+        ws_url = base_url.replace("http://", "ws://").replace("https://", "wss://").rstrip("/")
+        self.query_string = query_string
+        self.timeout = timeout
+        self.widgets = {}
+        self.exceptions = []
+        self._ws = connect(f"{ws_url}/_stcore/stream", subprotocols=["streamlit"],
+                           max_size=None, open_timeout=timeout)
+
+    def close(self):
+        self._ws.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 查询控件 ----------
+
+    def find(self, key):
+        """按用户指定的 key 查找控件，找不到返回 None"""
+        for widget in self.widgets.values():
+            if widget.key == key:
+                return widget
+        return None
+
+    def form_submitter(self, form_key):
+        """按 st.form 的 key 查找表单的提交按钮（streamlit 1.45 的 form_submit_button 不支持 key），找不到返回 None"""
+        for widget in self.widgets.values():
+            if widget.kind == "button" and widget.form_id == form_key:
+                return widget
+        return None
+
+    def buttons(self, prefix="", enabled=True):
+        return [
+            widget for widget in self.widgets.values()
+            if widget.kind == "button" and widget.key.startswith(prefix) and not (enabled and widget.disabled)
+        ]
+
+    # ---------- 交互 ----------
+
+    def run(self, widget_states=(), fragment_id=""):
+        """发起一次重跑并等待结束；fragment_id 非空时只重跑该 fragment"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        client_state = msg.rerun_script
+        client_state.query_string = self.query_string
+        client_state.page_script_hash = ""
+        client_state.fragment_id = fragment_id
+        client_state.widget_states.widgets.extend(widget_states)
+
+        start = time.perf_counter()
+        self._ws.send(msg.SerializeToString())
+        messages, size = self._receive_until_finished(full_run=not fragment_id)
+        return RunResult(time.perf_counter() - start, messages, size, bool(fragment_id))
+
+    def click(self, key, text_inputs=None):
+        """点击按钮（key 为用户指定的 key），text_inputs 为同时提交的 {文本框 key: 内容}"""
+        button = self.find(key)
+        if button is None:
+            raise KeyError(f"页面上没有按钮 {key}")
+        return self._press(button, text_inputs)
+
+    def submit_form(self, form_key, text_inputs=None):
+        """提交 key 为 form_key 的表单，text_inputs 同 click"""
+        button = self.form_submitter(form_key)
+        if button is None:
+            raise KeyError(f"页面上没有表单 {form_key}")
+        return self._press(button, text_inputs)
+
+    def _press(self, button, text_inputs):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        states = []
+        for input_key, text in (text_inputs or {}).items():
+            widget = self.find(input_key)
+            if widget is None:
+                raise KeyError(f"页面上没有文本框 {input_key}")
+            states.append(WidgetState(id=widget.id, string_value=text))
+        states.append(WidgetState(id=button.id, trigger_value=True))
+        return self.run(states, fragment_id=button.fragment_id)
+
+    # ---------- 接收 ----------
+
+    def _receive_until_finished(self, full_run):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        if full_run:
+            self.widgets = {}
+        messages = size = 0
+        deadline = time.monotonic() + self.timeout
+        while True:
+            raw = self._ws.recv(timeout=max(0.0, deadline - time.monotonic()))
+            messages += 1
+            size += len(raw)
+
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            kind = msg.WhichOneof("type")
+            if kind == "delta":
+                self._on_delta(msg.delta)
+            elif kind == "script_finished":
+                # st.rerun() 会先以 FINISHED_EARLY_FOR_RERUN 结束当前这次，随后自动开始新的一次
+                if msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return messages, size
+
+    def _on_delta(self, delta):
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.exceptions.append(element.exception.message)
+        elif kind in ("button", "text_area", "text_input"):
+            proto = getattr(element, kind)
+            self.widgets[proto.id] = Widget(
+                id=proto.id,
+                kind=kind,
+                label=proto.label,
+                fragment_id=delta.fragment_id,
+                disabled=bool(getattr(proto, "disabled", False)),
+                form_id=getattr(proto, "form_id", ""),
+            )
@@ -1,48 +1,101 @@
 # utils/db_utils.py
-import os
 import re
-import psycopg2
-from dotenv import load_dotenv
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+from utils.settings import get_settings
+
+
+@lru_cache(maxsize=1)
+def get_db_params():
+    """解析 DATABASE_URL（每个进程只解析一次）"""
+    db_url = get_settings().database_url
 
-def get_db_connection():
-    load_dotenv()
-    db_url = os.getenv("DATABASE_URL")
-    
-    # 清理可能存在的引号
-    if db_url and db_url.startswith(('"', "'")) and db_url.endswith(('"', "'")):
-        db_url = db_url[1:-1]
-    
     if not db_url:
         raise ValueError("DATABASE_URL 环境变量未设置")
-    
+
     # 手动解析URL
     pattern = r'^(?P<scheme>[^:]+)://(?P<user>[^:]+):(?P<password>[^@]+)@(?P<host>[^:]+):(?P<port>\d+)/(?P<dbname>.+)$'
     match = re.match(pattern, db_url)
-    
+
     if not match:
         pattern_no_port = r'^(?P<scheme>[^:]+)://(?P<user>[^:]+):(?P<password>[^@]+)@(?P<host>[^:/]+)/(?P<dbname>.+)$'
         match = re.match(pattern_no_port, db_url)
-        
+
         if not match:
             raise ValueError(f"无法解析数据库URL: {db_url}")
-        
+
         params = match.groupdict()
         params['port'] = 5432
     else:
         params = match.groupdict()
-    
+
     # 确保参数类型正确
-    port = int(params['port'])
-    host = params['host']
-    user = params['user']
-    password = params['password']
-    dbname = params['dbname']
-    
-    # 连接数据库
-    return psycopg2.connect(
-        host=host,
-        port=port,
-        dbname=dbname,
-        user=user,
-        password=password
-    )
\ No newline at end of file
+    return {
+        "host": params['host'],
+        "port": int(params['port']),
+        "dbname": params['dbname'],
+        "user": params['user'],
+        "password": params['password'],
+    }
+
+
+def get_db_connection():
+    """新建一个独立连接（调用方负责关闭），适合长时间占用连接的任务"""
+    import psycopg2
+    return psycopg2.connect(**get_db_params())
+
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """等待连接池空闲连接超时"""
+
+
+def get_db_pool():
+    """进程级连接池，首次使用时创建"""
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from psycopg2.pool import ThreadedConnectionPool
+                settings = get_settings()
+                # ThreadedConnectionPool 满时直接抛 PoolError，这里用信号量让借用方排队等待
+                _pool_slots = threading.BoundedSemaphore(settings.db_pool_max)
+                _pool = ThreadedConnectionPool(
+                    settings.db_pool_min,
+                    settings.db_pool_max,
+                    **get_db_params()
+                )
+    return _pool
+
+
+@contextmanager
+def pooled_connection(timeout=None):
+    """从连接池借出连接（池满时最多等待 timeout 秒），退出时回滚未提交事务并归还"""
+    pool = get_db_pool()
+    timeout = get_settings().db_pool_timeout if timeout is None else timeout
+    if not _pool_slots.acquire(timeout=timeout):
+        raise PoolTimeout(f"等待数据库连接超时（{timeout:.0f} 秒），连接池已满")
+
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+
+    try:
+        yield conn
+    finally:
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+        pool.putconn(conn, close=broken)
+        _pool_slots.release()
@@ -0,0 +1,11 @@
+# utils/http_utils.py
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def get_http_session():
+    """进程级 HTTP 会话（复用 TCP/TLS 连接），首次请求时才导入 requests"""
+    import requests
+    session = requests.Session()
+    session.headers.update({"User-Agent": "MultiSourceEventBrowser/1.0"})
+    return session
@@ -0,0 +1,174 @@
+# utils/icon_cache.py
+"""
+事件 / 市场图标的本地缓存：
+刷新数据后交给后台线程下载一次并缩放到展示尺寸，渲染时只读本地文件，
+目录总大小超过上限时按最近访问时间（mtime）淘汰。
+渲染时未命中的图标（存量 / 已关闭事件）也会登记后台下载，下次渲染即走本地缓存；
+需要一次性补齐时使用 python -m tools.backfill_icons。
+"""
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cachetools import TTLCache
+
+from utils.http_utils import get_http_session
+from utils.settings import get_settings
+
+ICON_SIZE = 80
+PREFETCH_WORKERS = 4
+
+_evict_lock = threading.Lock()
+
+# 后台下载：已登记（排队或下载中）的 URL，避免重复提交
+_prefetch_pool = None
+_queued = set()
+_prefetch_lock = threading.Lock()
+
+# 近期下载失败的 URL，避免渲染时每次未命中都重新登记
+_failed = TTLCache(maxsize=10_000, ttl=3600)
+
+
+def _icon_path(url):
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(get_settings().icon_cache_dir, f"{digest}.png")
+
+
+def cached_icon_path(url):
+    """返回已缓存图标的本地路径（并刷新其访问时间），未缓存返回 None"""
+    if not url:
+        return None
+    path = _icon_path(url)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def icon_source(url):
+    """渲染时使用：优先本地缓存，未命中时登记后台下载并回退到原始 URL"""
+    path = cached_icon_path(url)
+    if path:
+        return path
+    if url:
+        _schedule([url])
+    return url
+
+
+def cache_icon(url, size=ICON_SIZE):
+    """下载并缩放单个图标，返回本地路径；失败返回 None"""
+    if not url:
+        return None
+    path = _icon_path(url)
+    if os.path.exists(path):
+        return path
+
+    from PIL import Image
+
+    settings = get_settings()
+    try:
+        response = get_http_session().get(url, timeout=settings.http_timeout)
+        response.raise_for_status()
+        image = Image.open(io.BytesIO(response.content))
+        image.thumbnail((size, size))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+
+        os.makedirs(settings.icon_cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, format="PNG", optimize=True)
+        os.replace(tmp_path, path)
+        return path
+    except Exception as e:
+        print(f"[图标缓存] 下载失败 {url}: {e}")
+        with _prefetch_lock:
+            _failed[url] = True
+        return None
+
+
+def evict(max_bytes=None):
+    """按访问时间淘汰最旧的图标，直到目录总大小不超过上限"""
+    settings = get_settings()
+    max_bytes = settings.icon_cache_max_bytes if max_bytes is None else max_bytes
+
+    with _evict_lock:
+        try:
+            entries = [entry for entry in os.scandir(settings.icon_cache_dir) if entry.name.endswith(".png")]
+        except FileNotFoundError:
+            return 0
+
+        stats = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries]
+        total = sum(size for _, size, _ in stats)
+        removed = 0
+        for _, size, path in sorted(stats):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+def event_icon_urls(event_data):
+    """事件本身及其所有市场的图标 URL（去重）"""
+    urls = [event_data.get("icon")]
+    urls.extend(market.get("icon") for market in event_data.get("markets", []) or [])
+    return [url for url in dict.fromkeys(urls) if url]
+
+
+def _missing_urls(events):
+    urls = []
+    for event_data in events:
+        if isinstance(event_data, dict):
+            urls.extend(event_icon_urls(event_data))
+    return [url for url in dict.fromkeys(urls) if not os.path.exists(_icon_path(url))]
+
+
+def prefetch_icons(events, max_workers=4):
+    """同步下载尚未缓存的图标后执行一次容量淘汰（离线工具使用），返回成功下载的数量"""
+    missing = _missing_urls(events)
+    if not missing:
+        return 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        downloaded = sum(1 for path in pool.map(cache_icon, missing) if path)
+    evict()
+    return downloaded
+
+
+def _prefetch_one(url):
+    try:
+        cache_icon(url)
+    finally:
+        with _prefetch_lock:
+            _queued.discard(url)
+            idle = not _queued
+        # 一轮排队的图标全部处理完后再统一淘汰，避免每张图都扫描一次目录
+        if idle:
+            evict()
+
+
+def _schedule(urls):
+    global _prefetch_pool
+    with _prefetch_lock:
+        urls = [url for url in urls if url not in _queued and url not in _failed]
+        if not urls:
+            return 0
+        _queued.update(urls)
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="icon-prefetch")
+        pool = _prefetch_pool
+
+    for url in urls:
+        pool.submit(_prefetch_one, url)
+    return len(urls)
+
+
+def schedule_prefetch(events):
+    """非阻塞：把尚未缓存的图标交给后台线程下载，返回新登记的数量"""
+    return _schedule(_missing_urls(events))
@@ -0,0 +1,45 @@
+# utils/settings.py
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+@dataclass(frozen=True)
+class Settings:
+    """进程级配置（只在首次访问时从 .env / 环境变量加载一次）"""
+    database_url: str
+    db_pool_min: int
+    db_pool_max: int
+    db_pool_timeout: float
+    polymarket_api_url: str
+    http_timeout: float
+    icon_cache_dir: str
+    icon_cache_max_bytes: int
+    session_secret: str
+    session_ttl_hours: int
+
+
+def _clean(value):
+    """清理可能存在的引号"""
+    if value and value[0] in ('"', "'") and value[-1] in ('"', "'"):
+        return value[1:-1]
+    return value
+
+
+@lru_cache(maxsize=1)
+def get_settings():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    return Settings(
+        database_url=_clean(os.getenv("DATABASE_URL")),
+        db_pool_min=int(os.getenv("DB_POOL_MIN", "1")),
+        db_pool_max=int(os.getenv("DB_POOL_MAX", "10")),
+        db_pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        polymarket_api_url=_clean(os.getenv("POLYMARKET_API_URL")) or "https://gamma-api.polymarket.com",
+        http_timeout=float(os.getenv("HTTP_TIMEOUT", "10")),
+        icon_cache_dir=_clean(os.getenv("ICON_CACHE_DIR")) or os.path.join(".cache", "icons"),
+        icon_cache_max_bytes=int(os.getenv("ICON_CACHE_MAX_MB", "50")) * 1024 * 1024,
+        session_secret=_clean(os.getenv("SESSION_SECRET")) or "",
+        session_ttl_hours=int(os.getenv("SESSION_TTL_HOURS", "168")),
+    )